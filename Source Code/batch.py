@@ -0,0 +1,67 @@
+import numpy as np
+from engine import MAX_MISTAKES, REVEALED_CHARS
+
+# Many games of hangman advanced together with NumPy arrays
+# Each game is one row: the word as character codes, a mask of revealed
+# positions, a bitmask of tried letters and a mistake counter
+class BatchGames:
+    def __init__(self, words):
+        self.count = len(words)
+        width = max((len(word) for word in words), default=0)
+
+        # Words padded with zeros to the longest word, as character codes
+        self.words = np.zeros((self.count, width), dtype=np.uint32)
+        self.lengths = np.zeros(self.count, dtype=np.int32)
+        for row, word in enumerate(words):
+            self.words[row, :len(word)] = [ord(c) for c in word]
+            self.lengths[row] = len(word)
+
+        # Padding and pre-revealed characters start out revealed
+        hidden = self.words != 0
+        for char in REVEALED_CHARS:
+            hidden &= self.words != ord(char)
+        self.revealed = ~hidden
+
+        # One bit per letter a-z that has been tried, and the wrong guesses
+        self.tried = np.zeros(self.count, dtype=np.uint32)
+        self.mistakes = np.zeros(self.count, dtype=np.int8)
+
+    # Guess one letter in every game at once
+    # letters is a sequence of single characters or an array of character codes
+    # Games that are already over ignore their letter
+    # Only the letters a-z can be guessed, like the buttons of GameState
+    # Returns a boolean array of which guesses were correct
+    def guess(self, letters):
+        codes = np.asarray([ord(c) for c in letters] if isinstance(letters, (str, list, tuple)) else letters,
+            dtype=np.uint32)
+        if codes.shape != (self.count,):
+            raise ValueError(f"expected {self.count} letters, got {codes.shape}")
+        if ((codes < ord('a')) | (codes > ord('z'))).any():
+            raise ValueError("letters must be from a to z")
+
+        active = ~self.over()
+        bits = np.left_shift(np.uint32(1), codes - ord('a'))
+        fresh = active & ((self.tried & bits) == 0)
+
+        hits = self.words == codes[:, None]
+        correct = hits.any(axis=1)
+
+        self.revealed |= hits & fresh[:, None]
+        self.tried |= np.where(fresh, bits, 0).astype(np.uint32)
+        self.mistakes += (fresh & ~correct).astype(np.int8)
+        return correct & active
+
+    def won(self):
+        return self.revealed.all(axis=1)
+
+    def lost(self):
+        return self.mistakes >= MAX_MISTAKES
+
+    def over(self):
+        return self.won() | self.lost()
+
+    # The current guess of one game as a string, with dashes for hidden letters
+    def pattern(self, row):
+        length = self.lengths[row]
+        return ''.join(chr(code) if shown else '_'
+            for code, shown in zip(self.words[row, :length], self.revealed[row, :length]))
@@ -0,0 +1,56 @@
+import sys
+import threading
+from queue import Queue, Empty
+
+# Base of the writers that take records from the frame loop and write them on a background thread
+# The game only queues records, the thread waits for the first one, takes everything else that is
+# queued and passes them to write_batch in one go
+class BatchWriter:
+    def __init__(self, name, flush_interval):
+        self.flush_interval = flush_interval
+        self.queue = Queue()
+        self.thread = threading.Thread(target=self.write_loop, name=name, daemon=True)
+        self.thread.start()
+
+    # Called on the writer thread before the first batch and after the last one
+    def open_writer(self):
+        return
+
+    def close_writer(self):
+        return
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+    def write_loop(self):
+        self.open_writer()
+        running = True
+        while running:
+            # Wait for the first record, then take everything else that is queued
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+
+            # None is the signal to stop
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+
+            if batch:
+                try:
+                    self.write_batch(batch)
+                except Exception as error:
+                    # This batch is lost, but the thread keeps writing the next ones
+                    print(f"Could not write {len(batch)} {self.thread.name} records: {error}", file=sys.stderr)
+        self.close_writer()
+
+    # Write everything still queued and stop the thread
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,171 @@
+import os
+
+# Run without a window or sound, this has to be set before pygame starts
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import json
+import platform
+import shutil
+import tempfile
+from random import Random
+from statistics import median
+from time import perf_counter
+from os.path import join, abspath
+import pygame as pg
+from fsm import StateMachine
+from data import GameData
+from corpus import compile_corpus, find_topics
+from states import LoadState, HomeState, TopicsState, GameState, GameOverState
+
+# Headless benchmarks of loading, state switches, event handling and rendering
+# Results are written to a JSON file so builds can be compared
+
+# Time a function a few times, returns the median and the fastest run in seconds
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return {'median': median(times), 'min': min(times), 'runs': repeat}
+
+# Make an assets folder with the real fonts and sprite, and word lists of the given size
+def make_assets(source, target, topics, words_per_topic, rng):
+    shutil.copytree(join(source, 'fonts'), join(target, 'fonts'))
+    shutil.copytree(join(source, 'sprites'), join(target, 'sprites'))
+
+    os.makedirs(join(target, 'words'))
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    for topic in topics:
+        with open(join(target, 'words', topic + '.csv'), 'w') as words_file:
+            for _ in range(words_per_topic):
+                word = ''.join(rng.choice(letters) for _ in range(rng.randint(4, 12)))
+                hint = ' '.join(''.join(rng.choice(letters) for _ in range(5)) for _ in range(3))
+                words_file.write(f"{word}|{hint}\n")
+
+# Run LoadState until every asset has loaded
+def run_load(state_machine):
+    state_machine.switch_state(LoadState)
+    while isinstance(state_machine.current_state, LoadState) and not state_machine.current_state.finished:
+        state_machine.current_state.tick()
+
+# Load everything once into new game data, then release the memory-mapped corpus
+def load_once():
+    state_machine = StateMachine(GameData())
+    run_load(state_machine)
+    if state_machine.data.corpus:
+        state_machine.data.corpus.close()
+
+def bench_load(source, topics, sizes, repeat, rng):
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            make_assets(source, join(folder, 'assets'), topics, size, rng)
+            cwd = os.getcwd()
+            os.chdir(folder)
+            try:
+                results[f'csv_{size}'] = measure(load_once, repeat)
+                compile_corpus(join('assets', 'words'), topics)
+                results[f'corpus_{size}'] = measure(load_once, repeat)
+            finally:
+                os.chdir(cwd)
+    return results
+
+# The states to benchmark, and the arguments to switch to them with
+STATES = {
+    'HomeState': (HomeState,),
+    'TopicsState': (TopicsState,),
+    'GameState': (GameState,),
+    'GameOverState': (GameOverState, 'hangman', True)
+}
+
+# The first switch builds the state, later ones reuse it
+def bench_switch(state_machine, repeat):
+    return {name: measure(lambda: state_machine.switch_state(*args), repeat) for name, args in STATES.items()}
+
+def bench_render(state_machine, screen, repeat):
+    results = {}
+    for name, args in STATES.items():
+        state_machine.switch_state(*args)
+        def frame():
+            screen.fill((245, 245, 220))
+            state_machine.current_state.render(screen)
+        results[name] = measure(frame, repeat)
+    return results
+
+# Storms of mouse events over the game screen, without releasing the button so no letter is guessed
+def bench_events(state_machine, events, repeat, rng):
+    storms = {
+        'MOUSEMOTION': [pg.event.Event(pg.MOUSEMOTION, pos=(rng.randrange(800), rng.randrange(600)),
+            rel=(0, 0), buttons=(0, 0, 0)) for _ in range(events)],
+        'MOUSEBUTTONDOWN': [pg.event.Event(pg.MOUSEBUTTONDOWN, pos=(rng.randrange(800), rng.randrange(600)),
+            button=1) for _ in range(events)]
+    }
+
+    results = {}
+    for name, storm in storms.items():
+        state_machine.switch_state(GameState)
+        state = state_machine.current_state
+        def run():
+            for event in storm:
+                state.update(event)
+        result = measure(run, repeat)
+        result['events'] = events
+        result['per_event'] = result['median'] / events
+        results[name] = result
+    return results
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Benchmark the game without a display")
+    parser.add_argument('--assets', default='assets', help="folder with the real fonts and sprite")
+    parser.add_argument('--output', default='bench_results.json', help="JSON file for the results")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000, 100000], help="words per topic")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--events', type=int, default=10000, help="events in each storm")
+    parser.add_argument('--topics', type=int, help="no of made up topics (default: the real topics)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pg.init()
+    screen = pg.display.set_mode((800, 600))
+    rng = Random(args.seed)
+    source = abspath(args.assets)
+    if args.topics:
+        topics = [f"Topic {idx:04}" for idx in range(args.topics)]
+    else:
+        topics = find_topics(join(source, 'words'))
+
+    results = {
+        'python': platform.python_version(),
+        'pygame': pg.version.ver,
+        'machine': platform.machine(),
+        'load': bench_load(source, topics, args.sizes, max(1, args.repeat // 5), rng)
+    }
+
+    # The other benchmarks run with the smallest word lists loaded
+    with tempfile.TemporaryDirectory() as folder:
+        make_assets(source, join(folder, 'assets'), topics, args.sizes[0], rng)
+        cwd = os.getcwd()
+        os.chdir(folder)
+        try:
+            state_machine = StateMachine(GameData())
+            run_load(state_machine)
+        finally:
+            os.chdir(cwd)
+
+    results['switch_state'] = bench_switch(state_machine, args.repeat)
+    results['render'] = bench_render(state_machine, screen, args.repeat)
+    results['update'] = bench_events(state_machine, args.events, max(1, args.repeat // 5), rng)
+
+    with open(args.output, 'w') as out:
+        json.dump(results, out, indent=2)
+
+    for group in ['load', 'switch_state', 'render', 'update']:
+        for name, result in results[group].items():
+            print(f"{group:<14} {name:<18} {result['median'] * 1000:10.3f} ms")
+    print("Wrote", args.output)
+
+    pg.quit()
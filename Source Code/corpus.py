@@ -0,0 +1,217 @@
+import mmap
+import struct
+from array import array
+from os import stat, replace
+from os.path import join, exists, basename, splitext
+from glob import glob
+from csv import reader
+from collections.abc import Sequence
+
+# A compiled word corpus packs every topic's words and hints into one binary
+# file, so the game can mmap it instead of parsing the CSVs on every launch.
+#
+# Layout (all integers little-endian):
+#   header        magic, version, no of topics, position of the string table
+#   topic records one per topic: name offset/length in the string table,
+#                 mtime and size of the CSV it was built from, no of entries,
+#                 position of the entry offsets
+#   offsets       per topic, 2 * entries + 1 offsets into the string table;
+#                 entry i is the word [o[2i], o[2i+1]) and the hint [o[2i+1], o[2i+2])
+#   string table  utf-8 bytes of all the names, words and hints
+
+MAGIC = b'HANGCRP1'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+TOPIC = struct.Struct('<IIqqIQ')
+OFFSET = struct.Struct('<I')
+ENTRY = struct.Struct('<III')
+
+CORPUS_FILE = 'corpus.bin'
+
+# Read the words and hints of a topic from its CSV file
+def read_csv(path):
+    with open(path, newline='') as words_file:
+        return [row for row in reader(words_file, delimiter='|') if row]
+
+# Compile the CSVs of the given topics into one corpus file
+def compile_corpus(words_dir, topics, out_path=None):
+    out_path = out_path or join(words_dir, CORPUS_FILE)
+
+    strings = bytearray()
+    def add_string(text):
+        start = len(strings)
+        strings.extend(text.encode('utf-8'))
+        return start
+
+    records = []
+    offset_arrays = []
+    for topic in topics:
+        path = join(words_dir, topic + '.csv')
+        info = stat(path)
+        name_off = add_string(topic)
+
+        offsets = []
+        entries = read_csv(path)
+        for word, hint in entries:
+            offsets.append(add_string(word))
+            offsets.append(add_string(hint))
+        offsets.append(len(strings))
+
+        records.append([name_off, len(topic.encode('utf-8')), info.st_mtime_ns, info.st_size, len(entries)])
+        offset_arrays.append(offsets)
+
+    # Work out where every section goes
+    pos = HEADER.size + TOPIC.size * len(topics)
+    for record, offsets in zip(records, offset_arrays):
+        record.append(pos)
+        pos += OFFSET.size * len(offsets)
+    strings_pos = pos
+
+    # Write to a temporary file first so a running game never sees half a corpus
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, len(topics), strings_pos))
+        for record in records:
+            out.write(TOPIC.pack(*record))
+        for offsets in offset_arrays:
+            out.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        out.write(strings)
+    replace(tmp_path, out_path)
+
+    return out_path
+
+# The words and hints of one topic, decoded only when they are accessed
+class TopicEntries(Sequence):
+    def __init__(self, corpus, count, offsets_pos):
+        self.corpus = corpus
+        self.count = count
+        self.offsets_pos = offsets_pos
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self.count))]
+        if idx < 0:
+            idx += self.count
+        if not 0 <= idx < self.count:
+            raise IndexError("topic entry out of range")
+
+        # The offsets of the word, the hint and the end of the hint sit next to each other
+        word_start, hint_start, end = ENTRY.unpack_from(self.corpus.buffer, self.offsets_pos + OFFSET.size * 2 * idx)
+        return [self.corpus.string(word_start, hint_start), self.corpus.string(hint_start, end)]
+
+# The words and hints of one topic packed into one buffer, laid out like a topic of the corpus
+# Used for topics read again while the game runs, they take a few bytes per entry besides the text
+class PackedEntries(Sequence):
+    def __init__(self, strings, offsets):
+        self.strings = strings
+        self.offsets = offsets
+
+    def __len__(self):
+        return (len(self.offsets) - 1) // 2
+
+    def __getitem__(self, idx):
+        count = len(self)
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(count))]
+        if idx < 0:
+            idx += count
+        if not 0 <= idx < count:
+            raise IndexError("topic entry out of range")
+
+        word_start, hint_start, end = self.offsets[2 * idx:2 * idx + 3]
+        return [self.strings[word_start:hint_start].decode('utf-8'), self.strings[hint_start:end].decode('utf-8')]
+
+# Read a topic's CSV one row at a time straight into PackedEntries,
+# so a big file is never held in memory as a list of rows
+def stream_csv(path):
+    strings = bytearray()
+    offsets = array('I')
+    with open(path, newline='') as words_file:
+        for row in reader(words_file, delimiter='|'):
+            if row:
+                word, hint = row
+                offsets.append(len(strings))
+                strings += word.encode('utf-8')
+                offsets.append(len(strings))
+                strings += hint.encode('utf-8')
+    offsets.append(len(strings))
+    return PackedEntries(strings, offsets)
+
+# A compiled corpus file, memory-mapped for its whole lifetime
+class Corpus:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as corpus_file:
+            self.buffer = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, topic_count, self.strings_pos = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a version {VERSION} hangman corpus")
+
+        # Topic name -> (mtime, size) of the CSV it was built from, and its entries
+        self.sources = {}
+        self.topics = {}
+        for idx in range(topic_count):
+            name_off, name_len, mtime, size, count, offsets_pos = TOPIC.unpack_from(self.buffer, HEADER.size + TOPIC.size * idx)
+            name = self.string(name_off, name_off + name_len)
+            self.sources[name] = (mtime, size)
+            self.topics[name] = TopicEntries(self, count, offsets_pos)
+
+    # Decode a string, given its offsets in the string table
+    def string(self, start, end):
+        return self.buffer[self.strings_pos + start:self.strings_pos + end].decode('utf-8')
+
+    # Check that the corpus has every topic and was built from the current CSVs
+    # The topics are found from the CSVs (see find_topics), so the corpus is not shipped without them
+    def is_fresh(self, words_dir, topics):
+        for topic in topics:
+            if topic not in self.sources:
+                return False
+            path = join(words_dir, topic + '.csv')
+            if not exists(path):
+                return False
+            info = stat(path)
+            if (info.st_mtime_ns, info.st_size) != self.sources[topic]:
+                return False
+        return True
+
+    def close(self):
+        self.topics.clear()
+        self.buffer.close()
+
+# Open the compiled corpus in words_dir if it is up to date with the CSVs
+# Returns None if it is missing or stale, so the caller can read the CSVs instead
+def open_corpus(words_dir, topics):
+    path = join(words_dir, CORPUS_FILE)
+    if not exists(path):
+        return None
+    try:
+        corpus = Corpus(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if not corpus.is_fresh(words_dir, topics):
+        corpus.close()
+        return None
+    return corpus
+
+# Load the words of the given topics without pygame, for tools that run without the game
+# Uses the compiled corpus if it is up to date and the CSVs otherwise
+# Returns the corpus (or None) and the word lists arranged by topic
+def load_word_lists(words_dir, topics):
+    corpus = open_corpus(words_dir, topics)
+    if corpus:
+        return corpus, {topic: corpus.topics[topic] for topic in topics}
+    return None, {topic: read_csv(join(words_dir, topic + '.csv')) for topic in topics}
+
+# Names of the topics that have a CSV file in words_dir
+def find_topics(words_dir):
+    return sorted(splitext(basename(path))[0] for path in glob(join(words_dir, '*.csv')))
+
+if __name__ == '__main__':
+    # Build step: compile the CSVs in assets/words into assets/words/corpus.bin
+    words_dir = join('assets', 'words')
+    print("Wrote", compile_corpus(words_dir, find_topics(words_dir)))
@@ -1,14 +1,42 @@
+from random import getrandbits
+
 # A class used to store and share assets like fonts across states.
 class GameData:
     def __init__(self):
-        # The two sizes of fonts, and the spritesheet for the hangman
+        # The two sizes of fonts, and the spritesheet for the hangman (a sprites.SpriteAtlas)
         self.small_font = None
         self.large_font = None
         self.hangman_sprite = None
 
         # Stores all the words and hints, arranged by topics
         self.word_lists = {}
+        # Goes up every time topics are reloaded while the game runs (see watcher.py)
+        self.words_version = 0
+
+        # The compiled, memory-mapped word corpus (None when the CSVs were read instead)
+        self.corpus = None
         
-        # List of all topics and currently selected topics
-        self.all_topics = ["Computer", "English", "Physics", "Chemistry"]
-        self.current_topics = self.all_topics.copy()
+        # List of all topics (one for each CSV in assets/words, found by LoadState) and currently selected topics
+        self.all_topics = []
+        self.current_topics = []
+
+        # Draws the words for each game from the current topics (a sampler.WordSampler),
+        # the seed makes the order of the words repeatable
+        self.sampler = None
+        self.seed = getrandbits(64)
+
+        # Difficulty scores of the words arranged by topic, and the (low, high) band
+        # of scores to draw words from (None for every word)
+        self.difficulty_scores = {}
+        self.difficulty = None
+
+        # Records the games played (a journal.JournalWriter), only when turned on
+        self.journal = None
+
+        # Shows the games to viewer processes (a spectator.SpectatorBroadcast), only when turned on
+        self.spectators = None
+
+        # Name of the player, and the store for the statistics of their games (a stats.StatsStore),
+        # both only set when statistics are recorded
+        self.player = None
+        self.stats = None
@@ -0,0 +1,165 @@
+import sys
+import struct
+from array import array
+from os import stat, replace
+from os.path import join, exists
+from collections import Counter
+from engine import HangmanGame, MAX_MISTAKES
+from solver import WordIndex, Solver, play, ALPHABET, FALLBACK_ORDER
+
+# Offline scoring of how hard every word is, and the sidecar files that store the scores
+#
+# Each word is scored from:
+#   - the mistakes made by the solver, which knows every word in the corpus
+#   - the mistakes made by guessing letters in plain English frequency order
+#   - how rare its letters are in the corpus
+#   - how few different letters it has (fewer letters means fewer correct guesses)
+#   - how many words share its length and pattern of repeated letters
+# The raw scores are then ranked, so a word's difficulty is the fraction of words that are
+# easier than it: 0 is the easiest word in the corpus and 1 the hardest.
+#
+# The scores of a topic are kept in <topic>.difficulty next to its CSV: a header with the
+# mtime and size of the CSV they were computed from and the no of entries, then one
+# float32 per entry in the same order as the CSV.
+
+MAGIC = b'HANGDIF1'
+HEADER = struct.Struct('<8sqqI')
+SUFFIX = '.difficulty'
+
+# How much each feature adds to the raw score
+WEIGHTS = {'solver': 0.4, 'frequency': 0.2, 'rarity': 0.2, 'letters': 0.1, 'ambiguity': 0.1}
+
+# Named difficulty bands, as ranges of the ranked score
+BANDS = {'easy': (0.0, 1 / 3), 'medium': (1 / 3, 2 / 3), 'hard': (2 / 3, 1.0)}
+
+# The shape of a word's repeated letters, 'jazz' and 'buzz' are both 'abcc'
+def letter_pattern(word):
+    seen = {}
+    return ''.join(seen.setdefault(char, chr(ord('a') + len(seen))) if char != ' ' else ' ' for char in word)
+
+# Mistakes made by guessing letters in English frequency order
+def frequency_mistakes(word):
+    game = HangmanGame(word)
+    for letter in FALLBACK_ORDER:
+        if game.over():
+            break
+        game.guess(letter)
+    return game.mistakes
+
+# The solver, letter rarities and pattern counts of the corpus, set up once in every worker process
+worker = {}
+
+def init_worker(words):
+    letter_counts = Counter(char for word in words for char in word if char in ALPHABET)
+    most = max(letter_counts.values(), default=1)
+
+    worker['solver'] = Solver(WordIndex(words))
+    worker['rarity'] = {char: 1 - letter_counts[char] / most for char in ALPHABET}
+    worker['patterns'] = Counter(letter_pattern(word) for word in words)
+    worker['most_patterns'] = max(worker['patterns'].values(), default=1)
+
+# Raw difficulty of a chunk of words, run in the worker processes
+def score_words(words):
+    solver = worker['solver']
+    rarity = worker['rarity']
+    patterns = worker['patterns']
+
+    scores = []
+    for word in words:
+        letters = set(word) & set(ALPHABET)
+        game = HangmanGame(word)
+        play(game, solver)
+
+        features = {
+            'solver': game.mistakes / MAX_MISTAKES,
+            'frequency': frequency_mistakes(word) / MAX_MISTAKES,
+            'rarity': sum(rarity[char] for char in letters) / max(len(letters), 1),
+            'letters': 1 / max(len(letters), 1),
+            'ambiguity': patterns[letter_pattern(word)] / worker['most_patterns']
+        }
+        scores.append(sum(WEIGHTS[name] * value for name, value in features.items()))
+    return scores
+
+# Score every word of the given word lists with a pool of worker processes
+# Returns topic -> array of ranked scores, one per entry
+def score_corpus(word_lists, workers=None, chunk_size=2000):
+    # The game only reads the scores, so the process pool is imported here and not when it starts
+    from concurrent.futures import ProcessPoolExecutor
+    # Each different word is only scored once
+    words = sorted({word for entries in word_lists.values() for word, hint in entries})
+    chunks = [words[idx:idx + chunk_size] for idx in range(0, len(words), chunk_size)]
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(words,)) as pool:
+        raw = [score for chunk in pool.map(score_words, chunks) for score in chunk]
+
+    # Rank the raw scores, equal scores share the same rank
+    order = sorted(range(len(words)), key=raw.__getitem__)
+    ranked = {}
+    last = max(len(words) - 1, 1)
+    for position, idx in enumerate(order):
+        if position and raw[idx] == raw[order[position - 1]]:
+            ranked[words[idx]] = ranked[words[order[position - 1]]]
+        else:
+            ranked[words[idx]] = position / last
+
+    return {topic: array('f', (ranked[word] for word, hint in entries)) for topic, entries in word_lists.items()}
+
+def write_scores(words_dir, topic, scores):
+    info = stat(join(words_dir, topic + '.csv'))
+    path = join(words_dir, topic + SUFFIX)
+    with open(path + '.tmp', 'wb') as out:
+        out.write(HEADER.pack(MAGIC, info.st_mtime_ns, info.st_size, len(scores)))
+        # The scores are stored little-endian like the header
+        if sys.byteorder == 'big':
+            scores = array('f', scores)
+            scores.byteswap()
+        scores.tofile(out)
+    replace(path + '.tmp', path)
+
+# Read the scores of a topic, returns None if they are missing or older than the CSV
+def read_scores(words_dir, topic):
+    path = join(words_dir, topic + SUFFIX)
+    if not exists(path):
+        return None
+    with open(path, 'rb') as scores_file:
+        magic, mtime, size, count = HEADER.unpack(scores_file.read(HEADER.size))
+        if magic != MAGIC:
+            return None
+        csv_path = join(words_dir, topic + '.csv')
+        if exists(csv_path):
+            info = stat(csv_path)
+            if (info.st_mtime_ns, info.st_size) != (mtime, size):
+                return None
+        scores = array('f')
+        scores.fromfile(scores_file, count)
+    if sys.byteorder == 'big':
+        scores.byteswap()
+    return scores
+
+# Read the scores of every topic that has up to date scores
+def read_all_scores(words_dir, topics):
+    scores = {}
+    for topic in topics:
+        topic_scores = read_scores(words_dir, topic)
+        if topic_scores is not None:
+            scores[topic] = topic_scores
+    return scores
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from time import perf_counter
+    from corpus import find_topics, load_word_lists
+
+    parser = ArgumentParser(description="Score how hard every word is, and save the scores next to the CSVs")
+    parser.add_argument('--words', default=join('assets', 'words'), help="folder with the topic CSVs")
+    parser.add_argument('--workers', type=int, help="no of worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    topics = find_topics(args.words)
+    corpus, word_lists = load_word_lists(args.words, topics)
+
+    start = perf_counter()
+    all_scores = score_corpus(word_lists, args.workers)
+    for topic, scores in all_scores.items():
+        write_scores(args.words, topic, scores)
+    print(f"Scored {sum(len(scores) for scores in all_scores.values())} words in {perf_counter() - start:.2f}s")
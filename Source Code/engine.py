@@ -0,0 +1,59 @@
+# Core hangman rules, kept free of pygame so they can run without a display
+
+# No of wrong guesses that end the game
+MAX_MISTAKES = 6
+
+# Characters that are shown from the start and never need to be guessed
+REVEALED_CHARS = ' '
+
+# A single game of hangman
+class HangmanGame:
+    def __init__(self, word, hint=''):
+        # The word to guess (as a list of characters) and its hint
+        self.word = list(word)
+        self.hint = hint
+
+        # Store the no of wrong guesses
+        self.mistakes = 0
+
+        # List to store the current guess of the player
+        self.guessed = [c if c in REVEALED_CHARS else '_' for c in self.word]
+
+        # Letters that have already been tried
+        self.tried = set()
+
+    # Function to check if a guess is correct and place it
+    # Returns True if the letter is in the word
+    def guess(self, char):
+        # A letter that was already tried changes nothing
+        if char in self.tried:
+            return char in self.word
+        self.tried.add(char)
+
+        # Check if the character is in the word
+        if char in self.word:
+            # Go through the letters of the word
+            for idx, letter in enumerate(self.word):
+                if char == letter:
+                    # If the letter matches, replace the dash with the character
+                    self.guessed[idx] = char
+            return True
+
+        # Wrong guess
+        self.mistakes += 1
+        return False
+
+    # The current guess as a string, with dashes for hidden letters
+    def pattern(self):
+        return ''.join(self.guessed)
+
+    # The guess matches the word
+    def won(self):
+        return self.guessed == self.word
+
+    # The player made too many mistakes
+    def lost(self):
+        return self.mistakes >= MAX_MISTAKES
+
+    def over(self):
+        return self.won() or self.lost()
@@ -1,12 +1,42 @@
+from time import perf_counter
+
 # State Machine the handle all the different states
 class StateMachine:
     def __init__(self, data):
         # Store the common game data to share across states
         self.data = data
 
-    def switch_state(self, next_state):
-        # Change and prepare the next state
-        self.current_state = next_state
-        self.current_state.state_machine = self
-        self.current_state.data = self.data
-        self.current_state.load()
\ No newline at end of file
+        # Every state that has been created, by class
+        self.states = {}
+
+        # Optional profiler.Profiler, timing is only recorded when it is set
+        self.profiler = None
+
+    # Change to a state, creating it the first time it is used and reusing it after that
+    # Any extra arguments are passed to the state's reset
+    def switch_state(self, state_class, *args):
+        state = self.states.get(state_class)
+        first_time = state is None
+        if first_time:
+            state = state_class()
+            state.state_machine = self
+            state.data = self.data
+            self.states[state_class] = state
+
+        self.current_state = state
+        if first_time:
+            # Build the widgets, only done once
+            self.run(state, 'load', state.load)
+        # Prepare the state for this visit
+        self.run(state, 'reset', state.reset, *args)
+        # The new state has to be drawn in full
+        state.invalidate()
+
+    def run(self, state, phase, func, *args):
+        if self.profiler:
+            # Time how long the state takes to prepare
+            start = perf_counter()
+            func(*args)
+            self.profiler.record(state, phase, perf_counter() - start)
+        else:
+            func(*args)
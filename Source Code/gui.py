@@ -1,5 +1,51 @@
 import pygame as pg
 import string
+from collections import OrderedDict
+
+# Process-wide cache of rendered text, shared by all the widgets
+# Surfaces are kept in least recently used order and evicted once they use more than max_bytes
+class TextCache:
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        self.size += self.surface_bytes(surface)
+
+        # Always keep the newest surface, even if it is larger than the limit on its own
+        while self.size > self.max_bytes and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.size -= self.surface_bytes(old)
+            self.evictions += 1
+
+        return surface
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "entries": len(self.surfaces), "bytes": self.size}
+
+    def clear(self):
+        self.surfaces.clear()
+        self.size = 0
 
 class GUI:
     BACKGROUND = "back_color"
@@ -13,6 +59,7 @@ class GUI:
 
     default_options = None
     default_font = None
+    text_cache = TextCache()
 
     @staticmethod
     def create_defaults():
@@ -53,6 +100,11 @@ class GUI:
                 GUI.BORDER_SIZE: 4,
                 GUI.HOVERED_BACKGROUND: (200, 200, 200),
                 GUI.PRESSED_BACKGROUND: (100, 100, 100),
+            },
+            VirtualList.__name__: {
+                GUI.BACKGROUND: (200, 200, 200),
+                GUI.FOREGROUND: (0, 0, 0),
+                GUI.BORDER_SIZE: 0
             }
         }
 
@@ -68,6 +120,34 @@ class GUI:
         
         return options
 
+    def render_text(self, text):
+        return GUI.text_cache.render(self.options[GUI.FONT], text, True, self.options[GUI.FOREGROUND])
+
+    # Widgets are only redrawn when they are marked dirty
+    def mark_dirty(self):
+        self.dirty = True
+
+    # The area of the screen covered by the widget, including its border
+    def dirty_rect(self):
+        border = self.options[GUI.BORDER_SIZE]
+        return self.rect.inflate(border, border) if border > 0 else self.rect.copy()
+
+    # Called once per frame for animations, like the cursor blinking
+    def tick(self, ticks):
+        return
+
+    # The ticks at which the widget changes by itself next, or None if it only changes on events
+    def next_deadline(self):
+        return None
+
+    # Widgets that are hovered, pressed or focused still need mouse events away from their rect
+    def is_active(self):
+        return False
+
+    # Forget any hover, press or focus, used when a state is entered again
+    def reset(self):
+        return
+
 class Label(GUI):
     def __init__(self, rect, text, **kwargs):
         self.rect = rect
@@ -97,31 +177,33 @@ class Label(GUI):
         self.recreate()
 
     def recreate(self):
-        self.rendered_text = self.options[GUI.FONT].render(self.text, True, self.options[GUI.FOREGROUND])
+        self.rendered_text = self.render_text(self.text)
         self.rendered_text_rect = self.rendered_text.get_rect(center=self.rect.center)
+        self.mark_dirty()
 
 class Textbox(GUI):
     valid_text = (string.ascii_letters + string.digits + string.punctuation + " ")
+    # The text is rendered in pieces of this many characters, so typing only renders the last piece again
+    CHUNK_SIZE = 16
 
     def __init__(self, rect, text, **kwargs):
         self.rect = rect
         
         self.text = None
         self.text_changed = False
-        self.buffer = list(text)
         
         self.focused = False
         self.draw_cursor = True
         self.blink_counter = 0
         self.blink_time = 500
         
-        self.rendered_text = None
-        self.rendered_text_rect = None
-        self.visible_area = None
+        # The rendered pieces of the text, and their total width
+        self.chunks = []
+        self.text_width = 0
         
         self.options = self.with_defaults(kwargs)
 
-        self.recreate()
+        self.set_text(text)
 
     def render(self, screen):
         border = self.options[GUI.BORDER_SIZE]
@@ -130,47 +212,73 @@ class Textbox(GUI):
 
         pg.draw.rect(screen, self.options[GUI.BACKGROUND], self.rect)
 
-        screen.blit(self.rendered_text, self.rendered_text_rect, self.visible_area)
+        # Text too long for the box is scrolled so its end stays visible
+        text_area = self.rect.inflate(-10, 0)
+        x = text_area.left - max(self.text_width - text_area.width, 0)
+        clip = screen.get_clip()
+        screen.set_clip(text_area.clip(clip))
+        for chunk in self.chunks:
+            screen.blit(chunk, chunk.get_rect(x=x, centery=self.rect.centery))
+            x += chunk.get_width()
+        screen.set_clip(clip)
+
+        if self.draw_cursor and self.focused:
+            height = self.options[GUI.FONT].get_height()
+            cursor_start = (x, self.rect.centery - height // 2)
+            cursor_end = (x, self.rect.centery + height // 2)
+            pg.draw.line(screen, (0, 0, 0), cursor_start, cursor_end, 2)
 
-        ticks = pg.time.get_ticks()
+    def tick(self, ticks):
         if ticks - self.blink_counter > self.blink_time:
             self.draw_cursor = not self.draw_cursor
             self.blink_counter = ticks
-        if self.draw_cursor and self.focused:
-            cursor_start = (self.rendered_text_rect.left + self.visible_area.width, self.rendered_text_rect.top)
-            cursor_end = (self.rendered_text_rect.left + self.visible_area.width, self.rendered_text_rect.bottom)
-            pg.draw.line(screen, (0, 0, 0), cursor_start, cursor_end, 2)
+            if self.focused:
+                self.mark_dirty()
+
+    # The cursor only blinks while the textbox has focus
+    def next_deadline(self):
+        return self.blink_counter + self.blink_time + 1 if self.focused else None
 
     def update(self, event):
         if self.focused and event.type == pg.KEYDOWN:
             if event.key in [pg.K_LEFT, pg.K_RIGHT, pg.K_UP, pg.K_DOWN]:
                 return
-            elif event.key == pg.K_BACKSPACE and len(self.buffer) > 0:
-                self.buffer.pop()
-                self.recreate()
-            elif event.unicode in self.valid_text:
-                self.buffer.append(event.unicode)
-                self.recreate()
+            elif event.key == pg.K_BACKSPACE and len(self.text) > 0:
+                self.edit(self.text[:-1], len(self.text) - 1)
+            elif event.unicode and event.unicode in self.valid_text:
+                self.edit(self.text + event.unicode, len(self.text))
         elif event.type == pg.MOUSEBUTTONDOWN:
-            self.focused = self.rect.collidepoint(event.pos)
+            focused = self.rect.collidepoint(event.pos)
+            if focused != self.focused:
+                self.focused = focused
+                self.mark_dirty()
+
+    def is_active(self):
+        return self.focused
+
+    def reset(self):
+        if self.focused:
+            self.focused = False
+            self.mark_dirty()
 
     def set_text(self, text):
-        self.buffer = list(text)
-        self.recreate()
+        self.edit(text, 0)
 
     def recreate(self):
-        new_text = "".join(self.buffer)
-        self.text_changed = new_text != self.text
+        self.edit(self.text, 0)
 
-        self.text = new_text
-        self.rendered_text = self.options[GUI.FONT].render(self.text, True, self.options[GUI.FOREGROUND])
-        self.rendered_text_rect = self.rendered_text.get_rect(x=self.rect.left + 5, centery=self.rect.centery)
+    # Change the text, only the pieces from the first changed character on are rendered again
+    def edit(self, text, changed_from):
+        self.text_changed = text != self.text
+        self.text = text
+
+        first = changed_from // Textbox.CHUNK_SIZE
+        del self.chunks[first:]
+        for start in range(first * Textbox.CHUNK_SIZE, len(text), Textbox.CHUNK_SIZE):
+            self.chunks.append(self.render_text(text[start:start + Textbox.CHUNK_SIZE]))
+        self.text_width = sum(chunk.get_width() for chunk in self.chunks)
 
-        if self.rendered_text_rect.width > self.rect.width - 10:
-            offset = self.rendered_text_rect.width - (self.rect.width - 10)
-            self.visible_area = pg.Rect(offset, 0, self.rect.width - 10, self.rendered_text_rect.height)
-        else:
-            self.visible_area = self.rendered_text.get_rect()
+        self.mark_dirty()
 
 class Button(GUI):
     def __init__(self, rect, text, **kwargs):
@@ -206,6 +314,7 @@ class Button(GUI):
 
     def update(self, event):
         if self.enabled:
+            look = (self.hovered, self.pressed)
             if event.type == pg.MOUSEMOTION:
                 self.hovered = self.rect.collidepoint(event.pos)
             elif event.type == pg.MOUSEBUTTONDOWN:
@@ -214,20 +323,33 @@ class Button(GUI):
             elif event.type == pg.MOUSEBUTTONUP:
                 self.clicked = self.hovered and self.pressed
                 self.pressed = False
+            if look != (self.hovered, self.pressed):
+                self.mark_dirty()
+
+    def is_active(self):
+        return self.hovered or self.pressed
+
+    def reset(self):
+        if self.hovered or self.pressed or self.clicked:
+            self.hovered = self.pressed = self.clicked = False
+            self.mark_dirty()
 
     def click_handled(self):
         self.clicked = False
 
     def set_enabled(self, enabled):
-        self.enabled = enabled
+        if enabled != self.enabled:
+            self.enabled = enabled
+            self.mark_dirty()
 
     def set_text(self, text):
         self.text = text
         self.recreate()
         
     def recreate(self):
-        self.rendered_text = self.options[GUI.FONT].render(self.text, True, self.options[GUI.FOREGROUND])
+        self.rendered_text = self.render_text(self.text)
         self.rendered_text_rect = self.rendered_text.get_rect(center=self.rect.center)
+        self.mark_dirty()
 
 class ToggleButton(Button):
     def __init__(self, rect, text, **kwargs):
@@ -238,6 +360,7 @@ class ToggleButton(Button):
         super().update(event)
         if self.clicked:
             self.toggled = not self.toggled
+            self.mark_dirty()
             self.click_handled()
 
     def render(self, screen):
@@ -254,3 +377,220 @@ class ToggleButton(Button):
             pg.draw.rect(screen, (100, 100, 100), self.rect)
         
         screen.blit(self.rendered_text, self.rendered_text_rect)
+
+# A scrolling list or grid of cells, for more items than fit in its rect
+# Only the cells for the visible rows are created. When a row scrolls out of view its cells are
+# moved to the row scrolling in and bound to the new items, so memory and drawing cost stay
+# the same however many items there are.
+# create_cell() makes a new cell widget, and bind_cell(cell, index) fills a cell in for an item
+class VirtualList(GUI):
+    SCROLLBAR_WIDTH = 8
+
+    def __init__(self, rect, count, cell_size, create_cell, bind_cell, spacing=10, **kwargs):
+        self.rect = rect
+        self.count = count
+        self.cell_size = cell_size
+        self.spacing = spacing
+        self.bind_cell = bind_cell
+
+        # Cells per row, and enough rows of cells to cover the rect while a row is part way out of view
+        self.columns = max((rect.width - VirtualList.SCROLLBAR_WIDTH) // cell_size[0], 1)
+        self.visible_rows = -(-rect.height // cell_size[1]) + 1
+        self.rows = [[create_cell() for _ in range(self.columns)] for _ in range(self.visible_rows)]
+        # The row of items each row of cells is bound to (row r is always shown by cells r % visible_rows)
+        self.bound_rows = [None] * self.visible_rows
+
+        # Pixels scrolled from the top, and the last mouse position over the list (for the wheel)
+        self.scroll = 0
+        self.mouse_pos = None
+
+        self.options = self.with_defaults(kwargs)
+
+        self.layout()
+
+    def total_rows(self):
+        return -(-self.count // self.columns)
+
+    def max_scroll(self):
+        return max(self.total_rows() * self.cell_size[1] - self.rect.height, 0)
+
+    # Move the cells to where their rows are, binding the rows that came into view
+    def layout(self):
+        width, height = self.cell_size
+        first = self.scroll // height
+        for row in range(first, first + self.visible_rows):
+            slot = row % self.visible_rows
+            top = self.rect.top + row * height - self.scroll + self.spacing // 2
+            for column, cell in enumerate(self.rows[slot]):
+                cell.rect = pg.Rect(self.rect.left + column * width + self.spacing // 2, top,
+                    width - self.spacing, height - self.spacing)
+                index = row * self.columns + column
+                if self.bound_rows[slot] != row and index < self.count:
+                    self.bind_cell(cell, index)
+                else:
+                    cell.recreate()
+            self.bound_rows[slot] = row
+        self.mark_dirty()
+
+    # The index of every visible item and the cell showing it
+    def visible_cells(self):
+        first = self.scroll // self.cell_size[1]
+        for row in range(first, min(first + self.visible_rows, self.total_rows())):
+            for column, cell in enumerate(self.rows[row % self.visible_rows]):
+                index = row * self.columns + column
+                if index < self.count:
+                    yield index, cell
+
+    def scroll_to(self, scroll):
+        scroll = min(max(scroll, 0), self.max_scroll())
+        if scroll != self.scroll:
+            self.scroll = scroll
+            self.layout()
+
+            # Other items are under the mouse now
+            if self.mouse_pos:
+                self.update(pg.event.Event(pg.MOUSEMOTION, pos=self.mouse_pos, rel=(0, 0), buttons=(0, 0, 0)))
+
+    # Change the no of items, every visible cell is bound again
+    def set_count(self, count):
+        self.count = count
+        self.refresh()
+
+    # Bind every visible cell again, after the items changed
+    def refresh(self):
+        self.bound_rows = [None] * self.visible_rows
+        self.scroll = min(self.scroll, self.max_scroll())
+        self.layout()
+
+    def update(self, event):
+        if event.type == pg.MOUSEWHEEL:
+            if self.mouse_pos:
+                self.scroll_to(self.scroll - event.y * self.cell_size[1] // 2)
+            return
+        # The wheel also sends button events for buttons 4 and up, they would click the cells
+        if event.type in (pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP) and event.button > 3:
+            return
+
+        if event.type in (pg.MOUSEMOTION, pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP):
+            inside = self.rect.collidepoint(event.pos)
+            self.mouse_pos = event.pos if inside else None
+            if not inside:
+                # The parts of the cells outside the rect are hidden, so they can't be hovered or clicked
+                event = pg.event.Event(event.type, {**event.dict, 'pos': (-1, -1)})
+
+        for index, cell in self.visible_cells():
+            cell.update(event)
+
+    def render(self, screen):
+        clip = screen.get_clip()
+        screen.set_clip(self.rect.clip(clip))
+        for index, cell in self.visible_cells():
+            cell.render(screen)
+        screen.set_clip(clip)
+
+        max_scroll = self.max_scroll()
+        if max_scroll > 0:
+            track = pg.Rect(self.rect.right - VirtualList.SCROLLBAR_WIDTH, self.rect.top,
+                VirtualList.SCROLLBAR_WIDTH, self.rect.height)
+            thumb = track.copy()
+            thumb.height = max(track.height * self.rect.height // (self.rect.height + max_scroll), 20)
+            thumb.top = track.top + (track.height - thumb.height) * self.scroll // max_scroll
+            pg.draw.rect(screen, self.options[GUI.BACKGROUND], track)
+            pg.draw.rect(screen, self.options[GUI.FOREGROUND], thumb)
+
+    # A change in any cell redraws the whole list
+    def tick(self, ticks):
+        for index, cell in self.visible_cells():
+            cell.tick(ticks)
+            if cell.dirty:
+                cell.dirty = False
+                self.mark_dirty()
+
+    def next_deadline(self):
+        deadlines = [cell.next_deadline() for index, cell in self.visible_cells()]
+        return min((deadline for deadline in deadlines if deadline is not None), default=None)
+
+    def is_active(self):
+        return any(cell.is_active() for index, cell in self.visible_cells())
+
+    def reset(self):
+        self.mouse_pos = None
+        for row in self.rows:
+            for cell in row:
+                cell.reset()
+
+    def recreate(self):
+        self.layout()
+
+# Sends events only to the widgets that can react to them
+# Mouse events go to the widgets under the cursor, found with a uniform grid over their rects,
+# and to the widgets that are still hovered, pressed or focused. Other events go to every widget.
+class EventDispatcher:
+    CELL_SIZE = 64
+    MOUSE_EVENTS = (pg.MOUSEMOTION, pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP)
+
+    def __init__(self, widgets):
+        self.widgets = list(widgets)
+        self.active = []
+
+        # (column, row) -> widgets whose rect overlaps that cell
+        self.grid = {}
+        for widget in self.widgets:
+            for cell in self.cells(widget.rect):
+                self.grid.setdefault(cell, []).append(widget)
+
+    def cells(self, rect):
+        size = EventDispatcher.CELL_SIZE
+        for x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield (x, y)
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        for cell in self.cells(widget.rect):
+            self.grid.setdefault(cell, []).append(widget)
+
+    def remove(self, widget):
+        self.widgets.remove(widget)
+        if widget in self.active:
+            self.active.remove(widget)
+        for cell in self.cells(widget.rect):
+            self.grid[cell].remove(widget)
+
+    def widgets_at(self, pos):
+        size = EventDispatcher.CELL_SIZE
+        return [widget for widget in self.grid.get((pos[0] // size, pos[1] // size), [])
+            if widget.rect.collidepoint(pos)]
+
+    # Reset every widget, nothing is hovered, pressed or focused any more
+    def reset(self):
+        self.active = []
+        for widget in self.widgets:
+            widget.reset()
+
+    # Send the event to the widgets that need it, returns those widgets
+    def dispatch(self, event):
+        if event.type not in EventDispatcher.MOUSE_EVENTS:
+            targets = self.widgets
+            for widget in targets:
+                widget.update(event)
+            return targets
+
+        targets = self.widgets_at(event.pos)
+        for widget in self.active:
+            if widget not in targets:
+                targets.append(widget)
+
+        for widget in targets:
+            widget.update(event)
+
+        self.active = [widget for widget in targets if widget.is_active()]
+        return targets
+
+# Drop every mouse motion that is directly followed by another one, only the last position matters
+def coalesce_motion(events):
+    return [event for event, next_event in zip(events, events[1:] + [None])
+        if not (event.type == pg.MOUSEMOTION and next_event and next_event.type == pg.MOUSEMOTION)]
+
+# Event types the widgets react to
+EVENT_TYPES = [pg.MOUSEMOTION, pg.MOUSEBUTTONDOWN, pg.MOUSEBUTTONUP, pg.MOUSEWHEEL, pg.KEYDOWN]
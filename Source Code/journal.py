@@ -0,0 +1,138 @@
+import struct
+from time import time, perf_counter
+from engine import HangmanGame
+from batching import BatchWriter
+
+# Append-only binary journal of the games played, for reproducing bugs and testing rule changes
+#
+# The file starts with MAGIC, followed by records. Each record is its length (4 bytes,
+# little-endian, counting the type byte and the payload), its type (1 byte) and its payload:
+#   SESSION  seed of the word sampler (8 bytes), wall-clock time (8 byte float)
+#   START    word index (4 bytes), wall-clock time (8 byte float), topic length (2 bytes), topic
+#   GUESS    milliseconds since the game started (4 bytes), the letter (utf-8)
+#   END      won (1 byte), no of mistakes (1 byte)
+
+MAGIC = b'HANGJNL1'
+
+SESSION, START, GUESS, END = range(4)
+
+RECORD = struct.Struct('<IB')
+SESSION_DATA = struct.Struct('<Qd')
+START_DATA = struct.Struct('<IdH')
+GUESS_DATA = struct.Struct('<I')
+END_DATA = struct.Struct('<BB')
+
+def encode(kind, payload):
+    return RECORD.pack(len(payload) + 1, kind) + payload
+
+# Records games to a journal file
+# Records are only queued by the game, a background thread writes them in batches
+class JournalWriter(BatchWriter):
+    def __init__(self, path, seed, flush_interval=0.5):
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.game_start = 0
+
+        super().__init__("journal", flush_interval)
+        self.queue.put(encode(SESSION, SESSION_DATA.pack(seed, time())))
+
+    def start_game(self, topic, index):
+        self.game_start = perf_counter()
+        name = topic.encode('utf-8')
+        self.queue.put(encode(START, START_DATA.pack(index, time(), len(name)) + name))
+
+    def guess(self, letter):
+        elapsed = int((perf_counter() - self.game_start) * 1000)
+        self.queue.put(encode(GUESS, GUESS_DATA.pack(elapsed) + letter.encode('utf-8')))
+
+    def end_game(self, won, mistakes):
+        self.queue.put(encode(END, END_DATA.pack(won, mistakes)))
+
+    def write_batch(self, batch):
+        self.file.write(b''.join(batch))
+        self.file.flush()
+
+    # Write everything still queued and close the file
+    def close(self):
+        super().close()
+        self.file.close()
+
+# Read the records of a journal one at a time, as (type, payload)
+def read_records(path):
+    with open(path, 'rb') as journal_file:
+        if journal_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a hangman journal")
+        while True:
+            header = journal_file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            length, kind = RECORD.unpack(header)
+            payload = journal_file.read(length - 1)
+            if len(payload) < length - 1:
+                # The journal was cut off in the middle of a record
+                return
+            yield kind, payload
+
+# A recorded game: where its word came from, the guesses and the recorded result
+class RecordedGame:
+    def __init__(self, seed, topic, index, started):
+        self.seed = seed
+        self.topic = topic
+        self.index = index
+        self.started = started
+        self.guesses = []
+        self.result = None
+
+# Read the games of a journal one at a time, games that were never finished are skipped
+def read_games(path):
+    seed = 0
+    game = None
+    for kind, payload in read_records(path):
+        if kind == SESSION:
+            seed, _ = SESSION_DATA.unpack_from(payload)
+        elif kind == START:
+            index, started, length = START_DATA.unpack_from(payload)
+            topic = payload[START_DATA.size:START_DATA.size + length].decode('utf-8')
+            game = RecordedGame(seed, topic, index, started)
+        elif kind == GUESS and game:
+            elapsed, = GUESS_DATA.unpack_from(payload)
+            game.guesses.append((elapsed, payload[GUESS_DATA.size:].decode('utf-8')))
+        elif kind == END and game:
+            won, mistakes = END_DATA.unpack(payload)
+            game.result = (bool(won), mistakes)
+            yield game
+            game = None
+
+# Play a recorded game again with the current rules, returns (won, mistakes)
+def replay(game, word_lists):
+    word, hint = word_lists[game.topic][game.index]
+    engine = HangmanGame(word, hint)
+    for _, letter in game.guesses:
+        engine.guess(letter)
+    return engine.won(), engine.mistakes
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from os.path import join
+    from corpus import load_word_lists, find_topics
+
+    parser = ArgumentParser(description="Replay a hangman journal and check the results")
+    parser.add_argument('journal')
+    parser.add_argument('--words', default=join('assets', 'words'), help="folder with the topic CSVs")
+    args = parser.parse_args()
+
+    corpus, word_lists = load_word_lists(args.words, find_topics(args.words))
+
+    games = mismatches = 0
+    start = perf_counter()
+    for game in read_games(args.journal):
+        games += 1
+        result = replay(game, word_lists)
+        if result != game.result:
+            mismatches += 1
+            print(f"Game {games} ({game.topic} #{game.index}): recorded {game.result}, replayed {result}")
+    elapsed = perf_counter() - start
+
+    print(f"Replayed {games} games in {elapsed:.3f}s ({games / max(elapsed, 1e-9):,.0f} games/s), "
+        f"{mismatches} mismatches")
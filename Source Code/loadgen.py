@@ -0,0 +1,63 @@
+import asyncio
+import json
+from random import Random
+from time import perf_counter
+
+# Load generator for server.py: many clients play games at once over TCP
+# and the latency of every guess is recorded
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+async def request(reader, writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+# One client playing games until it has made its share of guesses
+async def client(host, port, guesses, latencies, seed):
+    rng = Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        reply = {'over': True}
+        letters = []
+        for _ in range(guesses):
+            if reply['over']:
+                await request(reader, writer, {'cmd': 'new'})
+                letters = rng.sample(ALPHABET, len(ALPHABET))
+
+            start = perf_counter()
+            reply = await request(reader, writer, {'cmd': 'guess', 'letter': letters.pop()})
+            latencies.append(perf_counter() - start)
+
+            if not reply['ok']:
+                raise RuntimeError(reply['error'])
+    finally:
+        writer.close()
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(host, port, clients, guesses):
+    latencies = []
+    start = perf_counter()
+    await asyncio.gather(*(client(host, port, guesses, latencies, seed) for seed in range(clients)))
+    elapsed = perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} guesses from {clients} clients in {elapsed:.2f}s "
+        f"({len(latencies) / elapsed:,.0f} guesses/s)")
+    print(f"p50 {percentile(latencies, 0.50) * 1000:.3f} ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms  "
+        f"max {latencies[-1] * 1000:.3f} ms")
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Measure the guess latency of a hangman server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--clients', type=int, default=100, help="no of concurrent connections")
+    parser.add_argument('--guesses', type=int, default=100, help="guesses made by each client")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.host, args.port, args.clients, args.guesses))
@@ -1,47 +1,209 @@
+from time import perf_counter
+# When the game started, for the startup profile
+start_time = perf_counter()
+
 import pygame as pg
+pygame_time = perf_counter()
+from argparse import ArgumentParser
+from os.path import join
 from fsm import StateMachine
 from data import GameData
 from states import LoadState
+from gui import EVENT_TYPES, coalesce_motion
+from profiler import Profiler, StartupProfile
+from difficulty import BANDS
+
+# Time each phase until the first frame is shown and the assets are loaded
+startup = StartupProfile(start_time)
+startup.phase("import pygame", pygame_time)
+startup.phase("import modules")
+
+# Command line options
+parser = ArgumentParser(description="Hangman")
+parser.add_argument('--profile', metavar='FILE', help="record per-state timings and write them to FILE on exit")
+parser.add_argument('--journal', metavar='FILE', help="record every game to a replay journal")
+parser.add_argument('--stats', metavar='FILE', default='stats.db', help="SQLite database for the game statistics")
+parser.add_argument('--no-stats', action='store_true', help="don't record any statistics")
+parser.add_argument('--player', help="name to record the statistics under")
+parser.add_argument('--difficulty', choices=BANDS, help="only play words of this difficulty (needs python difficulty.py)")
+parser.add_argument('--fixed-fps', action='store_true', help="draw every frame even when nothing changes")
+parser.add_argument('--profile-startup', action='store_true', help="print how long each phase of starting took")
+parser.add_argument('--broadcast', nargs='?', const='', metavar='NAME', help="show the games to viewers started with python spectator.py (under NAME if given)")
+parser.add_argument('--no-watch', action='store_true', help="don't reload the word lists when their files change")
+args = parser.parse_args()
+startup.phase("options")
 
-# Initialize the pygame library
-pg.init()
+# Initialize only the parts of the pygame library the game uses (pg.init() would also start
+# audio, joysticks and the rest)
+pg.display.init()
+pg.font.init()
+# The clock also starts pygame's timer, pg.time.get_ticks is always 0 before that
+clock = pg.time.Clock()
+startup.phase("pygame init")
+
+# Background colour of the window
+BACKGROUND = (245, 245, 220)
+# Most separate regions redrawn in a frame before they are merged into one
+MAX_DIRTY_RECTS = 8
+# Frames per second the game runs at
+FPS = 60
 
 # Create the window and set the title
 screen = pg.display.set_mode((800, 600))
 pg.display.set_caption("Hangman")
 
+# Posted by the word watcher's thread when reloaded topics are ready
+WORDS_CHANGED = pg.event.custom_type()
+
+# Only queue the events that the game or its widgets handle
+pg.event.set_blocked(None)
+pg.event.set_allowed([pg.QUIT, pg.VIDEOEXPOSE, WORDS_CHANGED] + EVENT_TYPES)
+startup.phase("window")
+
 # Create the state machine to handle the various states
 state_machine = StateMachine(GameData())
-state_machine.switch_state(LoadState())
+if args.profile:
+	state_machine.profiler = Profiler(FPS)
+if args.difficulty:
+	state_machine.data.difficulty = BANDS[args.difficulty]
+state_machine.switch_state(LoadState)
+startup.phase("state machine")
 
-# Clock for timing purposes
-clock = pg.time.Clock()
+# Reloads the topic CSVs when they change, started once the assets are loaded
+watcher = None
 
 # Infinite loop to run the game
 running = True
+idle = False
+first_frame = True
 while running:
 
+	if idle:
+		# Nothing is changing, so sleep until an event comes or the state's next deadline
+		deadline = state_machine.current_state.next_deadline()
+		if deadline is None:
+			events = [pg.event.wait()]
+		else:
+			events = [pg.event.wait(max(deadline - pg.time.get_ticks(), 1))]
+		events = [event for event in events if event.type != pg.NOEVENT] + pg.event.get()
+	else:
+		events = pg.event.get()
+
+	update_state = state_machine.current_state
+	update_start = perf_counter()
+	event_count = 0
+
 	# Loop through all the events like closing, mouse click, key press, etc.
-	for event in pg.event.get():
+	# Only the last of several mouse motions in a row is handled
+	for event in coalesce_motion(events):
+		event_count += 1
 		if event.type == pg.QUIT:
 			# If window is closed end the loop
 			running = False
 		elif event.type == pg.KEYDOWN and event.key == pg.K_F4 and event.mod & pg.KMOD_ALT:
 			# Else if Alt-F4 is pressed end the loop
 			running = False
+		elif event.type == pg.KEYDOWN and event.key == pg.K_F3:
+			# F3 shows or hides the profiling overlay, and starts profiling if needed
+			if not state_machine.profiler:
+				state_machine.profiler = Profiler(FPS)
+			state_machine.profiler.toggle_overlay()
+			state_machine.current_state.invalidate()
+		elif event.type == pg.VIDEOEXPOSE:
+			# The window has to be drawn again in full
+			state_machine.current_state.invalidate()
+		elif event.type == WORDS_CHANGED:
+			# Swap the reloaded topics in between two frames
+			if apply_word_changes(state_machine.data, watcher.poll()):
+				state_machine.current_state.words_changed()
 		else:
 			# Otherwise let the states process the other events
 			state_machine.current_state.update(event)
 
-	# Clear the screen
-	screen.fill((245, 245, 220))
-	# Draw the current state
-	state_machine.current_state.render(screen)
-	# Update the window graphics
-	pg.display.flip()
+	# Let the current state do its per-frame work
+	state_machine.current_state.tick()
+	update_time = perf_counter() - update_start
+	render_start = perf_counter()
+
+	# Find the regions of the screen that changed since the last frame
+	dirty_rects = state_machine.current_state.dirty_rects(screen)
+	# Too many small regions cost more than redrawing one region around them
+	if len(dirty_rects) > MAX_DIRTY_RECTS:
+		dirty_rects = [dirty_rects[0].unionall(dirty_rects[1:])]
+
+	# The profiling overlay changes every frame
+	profiler = state_machine.profiler
+	if profiler and profiler.show_overlay:
+		dirty_rects.append(profiler.overlay_rect)
+
+	for rect in dirty_rects:
+		# Clear and redraw the current state, only inside this region
+		screen.set_clip(rect)
+		screen.fill(BACKGROUND, rect)
+		state_machine.current_state.render(screen)
+		if profiler and profiler.show_overlay:
+			profiler.render(screen, state_machine.current_state)
+	screen.set_clip(None)
+
+	# Update only the changed parts of the window
+	if dirty_rects:
+		pg.display.update(dirty_rects)
+
+	if first_frame:
+		first_frame = False
+		startup.phase("first frame")
+
+		# The rest of the setup is not needed to show the first frame
+		if args.journal:
+			from journal import JournalWriter
+			state_machine.data.journal = JournalWriter(args.journal, state_machine.data.seed)
+		if not args.no_stats:
+			from stats import StatsStore, default_player
+			state_machine.data.stats = StatsStore(args.stats)
+			state_machine.data.player = args.player or default_player()
+		if args.broadcast is not None:
+			from spectator import SpectatorBroadcast, DEFAULT_NAME
+			state_machine.data.spectators = SpectatorBroadcast(args.broadcast or DEFAULT_NAME)
+		startup.phase("journal, stats and spectators")
+	elif not startup.done and not isinstance(state_machine.current_state, LoadState):
+		# Startup is over once the assets are loaded
+		startup.phase("load assets")
+		startup.done = True
+		if args.profile_startup:
+			print(startup.report())
+
+		if not args.no_watch:
+			from watcher import WordWatcher, apply_word_changes
+			watcher = WordWatcher(join('assets', 'words'), notify=lambda: pg.event.post(pg.event.Event(WORDS_CHANGED)))
+
+	if profiler:
+		profiler.frame(update_state, update_time, state_machine.current_state, perf_counter() - render_start,
+			event_count, clock.get_fps())
+
+	# Wait for the next event once a frame has nothing to draw and nothing to handle
+	# The profiling overlay and states that change every frame keep the game at full framerate
+	idle = not (args.fixed_fps or events or dirty_rects or state_machine.current_state.is_animating())
 
 	# Limit the framerate to 60fps
-	clock.tick(60)
+	clock.tick(FPS)
+
+# Save the profiling counters
+if args.profile:
+	state_machine.profiler.dump(args.profile)
+
+# Stop watching the word lists
+if watcher:
+	watcher.stop()
+
+# Write the rest of the journal
+if state_machine.data.journal:
+	state_machine.data.journal.close()
+# Tell the spectators the game is over
+if state_machine.data.spectators:
+	state_machine.data.spectators.close()
+# Save the statistics that are still queued
+if state_machine.data.stats:
+	state_machine.data.stats.close()
 
 # Terminate the pygame library
 pg.quit()
\ No newline at end of file
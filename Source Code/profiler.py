@@ -0,0 +1,130 @@
+import json
+import pygame as pg
+from array import array
+from time import perf_counter
+
+# Fixed-size buffer that keeps the most recent values, so profiling never grows memory
+class RingBuffer:
+    def __init__(self, size):
+        self.size = size
+        self.values = array('d', bytes(8 * size))
+        self.count = 0
+
+    def add(self, value):
+        self.values[self.count % self.size] = value
+        self.count += 1
+
+    # The stored values, oldest first
+    def recent(self):
+        if self.count <= self.size:
+            return list(self.values[:self.count])
+        start = self.count % self.size
+        return list(self.values[start:]) + list(self.values[:start])
+
+    def last(self):
+        return self.values[(self.count - 1) % self.size] if self.count else 0.0
+
+    def stats(self):
+        values = sorted(self.recent())
+        if not values:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': sum(values) / len(values),
+            'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max': values[-1]
+        }
+
+# Opt-in timing of each state's load, update and render, and of the frame rate
+# The state machine and the main loop only call it when StateMachine.profiler is set
+class Profiler:
+    def __init__(self, target_fps, size=600):
+        self.target_fps = target_fps
+        self.size = size
+
+        # (state name, 'load'/'update'/'render') -> durations in seconds
+        self.timings = {}
+        self.events = RingBuffer(size)
+        self.fps = RingBuffer(size)
+
+        self.show_overlay = False
+        self.overlay_rect = pg.Rect(5, 5, 260, 70)
+        self.font = None
+
+    def record(self, state, phase, seconds):
+        key = (type(state).__name__, phase)
+        buffer = self.timings.get(key)
+        if buffer is None:
+            buffer = self.timings[key] = RingBuffer(self.size)
+        buffer.add(seconds)
+
+    # Function to record everything measured during one frame
+    def frame(self, update_state, update_time, render_state, render_time, event_count, fps):
+        self.record(update_state, 'update', update_time)
+        self.record(render_state, 'render', render_time)
+        self.events.add(event_count)
+        self.fps.add(fps)
+
+    def summary(self):
+        return {
+            'target_fps': self.target_fps,
+            'fps': self.fps.stats(),
+            'events_per_frame': self.events.stats(),
+            'states': {f'{state}.{phase}': buffer.stats() for (state, phase), buffer in self.timings.items()}
+        }
+
+    # Write the summary and the recent raw values to a JSON file
+    def dump(self, path):
+        report = self.summary()
+        report['recent'] = {
+            'fps': self.fps.recent(),
+            'events_per_frame': self.events.recent(),
+            'states': {f'{state}.{phase}': buffer.recent() for (state, phase), buffer in self.timings.items()}
+        }
+        with open(path, 'w') as out:
+            json.dump(report, out, indent=2)
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+
+    # Draw the current frame rate and the last update and render times of the state
+    def render(self, screen, state):
+        if not self.font:
+            self.font = pg.font.Font(None, 20)
+
+        name = type(state).__name__
+        update = self.timings.get((name, 'update'))
+        render = self.timings.get((name, 'render'))
+        lines = [
+            f"FPS {self.fps.last():5.1f} / {self.target_fps}   events {self.events.last():.0f}",
+            f"{name}",
+            f"update {update.last() * 1000 if update else 0:6.2f} ms  render {render.last() * 1000 if render else 0:6.2f} ms"
+        ]
+
+        pg.draw.rect(screen, (0, 0, 0), self.overlay_rect)
+        for idx, line in enumerate(lines):
+            screen.blit(self.font.render(line, True, (255, 255, 255)), (self.overlay_rect.x + 5, self.overlay_rect.y + 5 + idx * 20))
+
+# Times the phases of starting the game, each phase ends when the next one starts
+class StartupProfile:
+    def __init__(self, start):
+        self.start = start
+        self.last = start
+        # (phase name, seconds)
+        self.phases = []
+        self.done = False
+
+    # End a phase, now or at the given perf_counter time
+    def phase(self, name, end=None):
+        end = perf_counter() if end is None else end
+        self.phases.append((name, end - self.last))
+        self.last = end
+
+    # A table of the phases, with the time since the start at the end of each
+    def report(self):
+        lines = ["Startup phase              ms    total ms"]
+        total = 0
+        for name, seconds in self.phases:
+            total += seconds
+            lines.append(f"{name:<20} {seconds * 1000:8.1f}  {total * 1000:10.1f}")
+        return '\n'.join(lines)
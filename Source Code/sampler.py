@@ -0,0 +1,186 @@
+from array import array
+from random import Random
+
+# No of free (zero) bits in a byte, and the position of the kth free bit of a byte at byte * 8 + k
+FREE_BITS = bytes(8 - bin(byte).count('1') for byte in range(256))
+KTH_FREE_BIT = bytes(bit for byte in range(256)
+    for bit in [bit for bit in range(8) if not byte >> bit & 1] + [0] * (8 - FREE_BITS[byte]))
+
+# Words per block of the bitset, the tree counts the free words of each block
+BLOCK_SIZE = 64
+
+# Remembers which words of a topic were drawn, one bit per word, so no word repeats until all were used
+# A Fenwick tree over the no of free words in each block finds the kth free word in O(log n) steps,
+# so a random k draws every free word with the same chance, however many were drawn
+class ShuffleBag:
+    def __init__(self, size):
+        self.size = size
+        self.blocks = (size + BLOCK_SIZE - 1) // BLOCK_SIZE
+        # Largest power of two no more than the no of blocks, where the tree search starts
+        self.top = 1 << (self.blocks.bit_length() - 1) if self.blocks else 0
+        self.clear()
+
+    def clear(self):
+        self.used = bytearray(self.blocks * BLOCK_SIZE // 8)
+        self.count = 0
+        # The bits past the last word count as drawn
+        end = (self.size + 7) // 8
+        if self.size % 8:
+            self.used[end - 1] = 0xff << (self.size % 8) & 0xff
+        self.used[end:] = b'\xff' * (len(self.used) - end)
+
+        # tree[i] is the no of free words in the blocks i - (i & -i) to i - 1, built in O(n)
+        self.tree = array('I', [0] + [BLOCK_SIZE] * self.blocks)
+        if self.blocks:
+            self.tree[-1] = self.size - (self.blocks - 1) * BLOCK_SIZE
+        for idx in range(1, self.blocks + 1):
+            parent = idx + (idx & -idx)
+            if parent <= self.blocks:
+                self.tree[parent] += self.tree[idx]
+
+    def mark(self, idx):
+        self.used[idx >> 3] |= 1 << (idx & 7)
+        self.count += 1
+        node = (idx // BLOCK_SIZE) + 1
+        while node <= self.blocks:
+            self.tree[node] -= 1
+            node += node & -node
+
+    # Draw the index of a word that was not drawn yet, starting over once every word was drawn
+    def draw(self, rng):
+        if self.count >= self.size:
+            self.clear()
+        free = rng.randrange(self.size - self.count)
+
+        # Find the block with the free word no free in it
+        tree = self.tree
+        block = 0
+        step = self.top
+        while step:
+            node = block + step
+            if node <= self.blocks and tree[node] <= free:
+                block = node
+                free -= tree[node]
+            step >>= 1
+
+        # Then its byte and bit
+        byte_idx = block * BLOCK_SIZE // 8
+        while free >= FREE_BITS[self.used[byte_idx]]:
+            free -= FREE_BITS[self.used[byte_idx]]
+            byte_idx += 1
+        idx = byte_idx * 8 + KTH_FREE_BIT[self.used[byte_idx] * 8 + free]
+        self.mark(idx)
+        return idx
+
+# Vose's alias method: after an O(n) build, one of n items is drawn in O(1) in proportion to its weight
+class AliasTable:
+    def __init__(self, weights):
+        count = len(weights)
+        total = sum(weights)
+        self.prob = [0.0] * count
+        self.alias = list(range(count))
+
+        scaled = [weight * count / total for weight in weights]
+        small = [idx for idx, value in enumerate(scaled) if value < 1]
+        large = [idx for idx, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        for idx in small + large:
+            self.prob[idx] = 1.0
+
+    def draw(self, rng):
+        idx = rng.randrange(len(self.prob))
+        return idx if rng.random() < self.prob[idx] else self.alias[idx]
+
+# Draws words from the selected topics, each word equally likely whatever the size of its topic,
+# and without repeating a word of a topic until every word in it was drawn
+# With difficulty scores and a band, only the words whose score is in the band are drawn
+class WordSampler:
+    def __init__(self, word_lists, rng=None, scores=None):
+        self.word_lists = word_lists
+        self.rng = rng or Random()
+
+        # Topic -> difficulty scores of its words (see difficulty.py), and the band to draw from
+        self.scores = scores or {}
+        self.band = None
+        # Topic -> indexes of the words in the band, topics without an entry use all their words
+        self.eligible = {}
+
+        # Topic -> ShuffleBag, kept while the topic is not selected so its history survives
+        self.bags = {}
+        self.selected = []
+        self.topics = []
+        self.table = None
+
+    # No of words of a topic that can be drawn, with the band's indexes in eligible (the current ones by default)
+    def size(self, topic, eligible=None):
+        indexes = (self.eligible if eligible is None else eligible).get(topic)
+        return len(self.word_lists[topic]) if indexes is None else len(indexes)
+
+    # Change the selected topics, only the alias table over them is rebuilt
+    # Raises ValueError and changes nothing if the topics have no words to draw
+    def select(self, topics):
+        nonempty = [topic for topic in topics if self.size(topic) > 0]
+        if not nonempty:
+            raise ValueError("no words in the selected topics")
+        self.selected = list(topics)
+        self.topics = nonempty
+
+        for topic in self.topics:
+            if topic not in self.bags:
+                self.bags[topic] = ShuffleBag(self.size(topic))
+        self.table = AliasTable([self.size(topic) for topic in self.topics])
+
+    # Indexes of the words of a topic whose score is in the band
+    @staticmethod
+    def band_indexes(scores, band):
+        low, high = band
+        return array('I', (idx for idx, score in enumerate(scores) if low <= score <= high))
+
+    # Only draw the words with a difficulty score from low to high (None draws every word)
+    # Topics without scores are drawn from in full
+    # The topics are selected again, or the given topics instead
+    # Raises ValueError and changes nothing if the topics have no words in the band
+    def set_band(self, band, topics=None):
+        topics = self.selected if topics is None else topics
+        eligible = {}
+        if band:
+            for topic, scores in self.scores.items():
+                eligible[topic] = self.band_indexes(scores, band)
+        if topics and not any(self.size(topic, eligible) for topic in topics):
+            raise ValueError("no words of this difficulty in the selected topics")
+
+        self.band = band
+        self.eligible = eligible
+        # The bags are sized for the old bands
+        self.bags.clear()
+        if topics:
+            self.select(topics)
+
+    # The words of a topic were replaced (or removed), with its new scores or None
+    # Only this topic's bag and band are made again, call select afterwards to rebuild the alias table
+    def replace_topic(self, topic, scores=None):
+        self.bags.pop(topic, None)
+        self.eligible.pop(topic, None)
+        if scores is None:
+            self.scores.pop(topic, None)
+        else:
+            self.scores[topic] = scores
+            if self.band:
+                self.eligible[topic] = self.band_indexes(scores, self.band)
+
+    # Draw a topic and the index of one of its words
+    def draw_index(self):
+        topic = self.topics[self.table.draw(self.rng)]
+        idx = self.bags[topic].draw(self.rng)
+        eligible = self.eligible.get(topic)
+        return topic, idx if eligible is None else eligible[idx]
+
+    # Draw a word and its hint
+    def draw(self):
+        topic, idx = self.draw_index()
+        return self.word_lists[topic][idx]
@@ -0,0 +1,164 @@
+import re
+from array import array
+from bisect import bisect_right
+from itertools import repeat
+
+# Sorted indexes over every word and hint, for searching them by prefix as the user types
+#
+# Words are sorted in lower case. Hints are sorted once for every word they contain, from the
+# start of that word to the end of the hint, so 'music' and 'of mu' both find 'style of music'.
+# The indexes only hold entry ids (and where the hint word starts), the text is looked up in
+# the word lists when it is compared, so a memory-mapped corpus stays on disk.
+
+# Where every word of a hint starts
+HINT_WORD = re.compile(r'\S+')
+
+# Sorts after every character, so prefix + LAST_CHAR is past every string that starts with prefix
+LAST_CHAR = '\U0010ffff'
+
+class SearchIndex:
+    def __init__(self, word_lists):
+        self.word_lists = word_lists
+        self.topics = list(word_lists)
+
+        # The id of the first entry of each topic, the entries of all topics are numbered in order
+        self.starts = []
+        total = 0
+        for topic in self.topics:
+            self.starts.append(total)
+            total += len(word_lists[topic])
+        self.total = total
+
+        # Entry ids ordered by their word
+        words = [word.lower() for topic in self.topics for word, hint in word_lists[topic]]
+        self.by_word = array('I', sorted(range(total), key=words.__getitem__))
+        del words
+
+        # (entry id, start of a hint word) ordered by the hint from that word on
+        keys = []
+        entry_ids = array('I')
+        offsets = array('H')
+        entry_id = 0
+        for topic in self.topics:
+            for word, hint in word_lists[topic]:
+                hint = hint.lower()
+                starts = [match.start() for match in HINT_WORD.finditer(hint)]
+                keys.extend(hint[start:] for start in starts)
+                entry_ids.extend(repeat(entry_id, len(starts)))
+                offsets.extend(starts)
+                entry_id += 1
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        del keys
+        self.by_hint = array('I', map(entry_ids.__getitem__, order))
+        self.hint_offsets = array('H', map(offsets.__getitem__, order))
+
+    # The topic, index, word and hint of an entry
+    def entry(self, entry_id):
+        topic_idx = bisect_right(self.starts, entry_id) - 1
+        topic = self.topics[topic_idx]
+        idx = entry_id - self.starts[topic_idx]
+        word, hint = self.word_lists[topic][idx]
+        return topic, idx, word, hint
+
+    def word_key(self, position):
+        return self.entry(self.by_word[position])[2].lower()
+
+    def hint_key(self, position):
+        return self.entry(self.by_hint[position])[3].lower()[self.hint_offsets[position]:]
+
+    # First position from lo to hi whose key is not less than target
+    @staticmethod
+    def lower_bound(key, target, lo, hi):
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # The positions from lo to hi whose key starts with prefix, as a (start, end) range
+    def narrow(self, key, prefix, lo, hi):
+        start = self.lower_bound(key, prefix, lo, hi)
+        return start, self.lower_bound(key, prefix + LAST_CHAR, start, hi)
+
+# The matches of a search that changes one keystroke at a time
+# Each longer prefix is only searched for inside the matches of the shorter one, and the ranges
+# of the shorter prefixes are kept, so deleting a character needs no search at all
+class PrefixSearch:
+    def __init__(self, index):
+        self.index = index
+        # (prefix, range of by_word, range of by_hint) for the prefixes typed so far
+        self.stack = [('', (0, index.total), (0, len(index.by_hint)))]
+
+    @property
+    def prefix(self):
+        return self.stack[-1][0]
+
+    def set_prefix(self, prefix):
+        prefix = prefix.lower()
+        while not prefix.startswith(self.stack[-1][0]):
+            self.stack.pop()
+        if prefix != self.stack[-1][0]:
+            _, (word_lo, word_hi), (hint_lo, hint_hi) = self.stack[-1]
+            self.stack.append((prefix, self.index.narrow(self.index.word_key, prefix, word_lo, word_hi),
+                self.index.narrow(self.index.hint_key, prefix, hint_lo, hint_hi)))
+
+    def ranges(self):
+        prefix, word_range, hint_range = self.stack[-1]
+        # With nothing typed every word is listed once, not once more for each hint word
+        return word_range, hint_range if prefix else (0, 0)
+
+    # No of matches, the words that match come first and then the hints
+    def count(self):
+        (word_lo, word_hi), (hint_lo, hint_hi) = self.ranges()
+        return word_hi - word_lo + hint_hi - hint_lo
+
+    # The topic, index, word and hint of a match
+    def result(self, idx):
+        (word_lo, word_hi), (hint_lo, hint_hi) = self.ranges()
+        if idx < word_hi - word_lo:
+            return self.index.entry(self.index.by_word[word_lo + idx])
+        return self.index.entry(self.index.by_hint[hint_lo + idx - (word_hi - word_lo)])
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from os.path import join
+    from random import Random
+    from time import perf_counter
+    from corpus import find_topics, load_word_lists
+
+    parser = ArgumentParser(description="Time prefix searches over the word lists")
+    parser.add_argument('--words', default=join('assets', 'words'), help="folder with the topic CSVs")
+    parser.add_argument('--entries', type=int, help="search made up word lists of this size instead")
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = Random(0)
+    if args.entries:
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        def made_up(length):
+            return ''.join(rng.choice(letters) for _ in range(length))
+        word_lists = {'Made up': [[made_up(rng.randint(4, 12)), ' '.join(made_up(5) for _ in range(3))]
+            for _ in range(args.entries)]}
+    else:
+        corpus, word_lists = load_word_lists(args.words, find_topics(args.words))
+
+    start = perf_counter()
+    index = SearchIndex(word_lists)
+    print(f"Indexed {index.total} entries in {perf_counter() - start:.2f}s")
+
+    # Type random words one key at a time, then delete them again
+    words = [word for entries in word_lists.values() for word, hint in entries]
+    times = []
+    for _ in range(args.queries):
+        search = PrefixSearch(index)
+        word = rng.choice(words)
+        for prefix in [word[:end] for end in range(1, len(word) + 1)] + [word[:end] for end in range(len(word) - 1, -1, -1)]:
+            start = perf_counter()
+            search.set_prefix(prefix)
+            search.count()
+            times.append(perf_counter() - start)
+    times.sort()
+    print(f"{len(times)} keystrokes: median {times[len(times) // 2] * 1e6:.1f}us, "
+        f"p99 {times[len(times) * 99 // 100] * 1e6:.1f}us, max {times[-1] * 1e6:.1f}us")
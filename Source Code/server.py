@@ -0,0 +1,162 @@
+import asyncio
+import json
+import sys
+from random import choice
+from time import monotonic
+from os.path import join
+from data import GameData
+from engine import HangmanGame
+from corpus import load_word_lists, find_topics
+
+# Asyncio server that hosts many hangman games from one process
+#
+# The protocol is one JSON object per line in each direction:
+#   {"cmd": "new", "topics": ["Physics"]}  start a game (topics are optional)
+#   {"cmd": "guess", "letter": "e"}        guess a letter in the current game
+#   {"cmd": "state"}                       show the current game
+# Every reply has "ok", and either the game ("pattern", "hint", "mistakes",
+# "tried", "over", "won", and "word" once it is over) or an "error".
+
+# Longest request line accepted, so a client can't make a session buffer without limit
+MAX_LINE = 1024
+
+# The letters that can be guessed, the same as the buttons of GameState
+LETTERS = set('abcdefghijklmnopqrstuvwxyz')
+
+# One connected player and their current game
+class Session:
+    __slots__ = ('game', 'last_active', 'writer')
+
+    def __init__(self, writer):
+        self.game = None
+        self.last_active = monotonic()
+        self.writer = writer
+
+class HangmanServer:
+    def __init__(self, data, max_sessions=10000, idle_timeout=300):
+        # The word lists are shared by every session
+        self.data = data
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = set()
+
+    # Function to handle one request, returns the reply
+    def handle_command(self, session, request):
+        cmd = request.get('cmd')
+
+        if cmd == 'new':
+            topics = request.get('topics') or self.data.current_topics
+            if not isinstance(topics, list) or \
+                    any(not isinstance(topic, str) or topic not in self.data.word_lists for topic in topics):
+                return {'ok': False, 'error': "unknown topic"}
+            # Randomly select a topic, then randomly select a word from that topic
+            session.game = HangmanGame(*choice(self.data.word_lists[choice(topics)]))
+        elif session.game is None:
+            return {'ok': False, 'error': "no game, send a 'new' command first"}
+        elif cmd == 'guess':
+            letter = request.get('letter')
+            if not isinstance(letter, str) or letter.lower() not in LETTERS:
+                return {'ok': False, 'error': "letter must be a single letter from a to z"}
+            if session.game.over():
+                return {'ok': False, 'error': "game is over"}
+            session.game.guess(letter.lower())
+        elif cmd != 'state':
+            return {'ok': False, 'error': f"unknown command {cmd!r}"}
+
+        return self.describe(session.game)
+
+    @staticmethod
+    def describe(game):
+        reply = {
+            'ok': True,
+            'pattern': game.pattern(),
+            'hint': game.hint,
+            'mistakes': game.mistakes,
+            'tried': ''.join(sorted(game.tried)),
+            'over': game.over(),
+            'won': game.won()
+        }
+        if reply['over']:
+            reply['word'] = ''.join(game.word)
+        return reply
+
+    async def handle_client(self, reader, writer):
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(b'{"ok": false, "error": "server is full"}\n')
+            await writer.drain()
+            writer.close()
+            return
+
+        session = Session(writer)
+        self.sessions.add(session)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(b'{"ok": false, "error": "request too long"}\n')
+                    break
+                if not line:
+                    break
+
+                session.last_active = monotonic()
+                try:
+                    request = json.loads(line)
+                    reply = self.handle_command(session, request) if isinstance(request, dict) else \
+                        {'ok': False, 'error': "request must be an object"}
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    reply = {'ok': False, 'error': "invalid JSON"}
+                except Exception as error:
+                    # A bad request must not end the session, the error is logged and the client told
+                    print(f"Error handling {line[:100]!r}: {error!r}", file=sys.stderr)
+                    reply = {'ok': False, 'error': "internal error"}
+
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    # Close the sessions that have not sent anything for idle_timeout seconds
+    async def evict_idle(self):
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 5))
+            deadline = monotonic() - self.idle_timeout
+            for session in [session for session in self.sessions if session.last_active < deadline]:
+                self.sessions.discard(session)
+                session.writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        evictor = asyncio.create_task(self.evict_idle())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Host hangman games over TCP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--idle-timeout', type=float, default=300, help="seconds before an idle session is closed")
+    args = parser.parse_args()
+
+    # Load the same topics and words the game uses
+    data = GameData()
+    words_dir = join('assets', 'words')
+    data.all_topics = find_topics(words_dir)
+    # Games are drawn from every topic unless a client picks some
+    data.current_topics = data.all_topics.copy()
+    data.corpus, data.word_lists = load_word_lists(words_dir, data.all_topics)
+
+    print(f"Serving hangman on {args.host}:{args.port}")
+    try:
+        asyncio.run(HangmanServer(data, args.max_sessions, args.idle_timeout).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
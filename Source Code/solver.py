@@ -0,0 +1,145 @@
+from engine import HangmanGame
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+# Letters in rough order of how common they are in English, used when no word matches
+FALLBACK_ORDER = 'etaoinsrhldcumfpgwybvkxjqz'
+
+# Count the set bits of an integer bitset
+def popcount(bits):
+    return bin(bits).count('1')
+
+# Indexes over a list of words, so the words matching a guess can be found with bitset operations
+# Words are grouped by length, and inside a group word i is bit i of every bitset
+class WordIndex:
+    def __init__(self, words):
+        # Length -> list of the words with that length
+        self.by_length = {}
+        for word in set(words):
+            self.by_length.setdefault(len(word), []).append(word)
+
+        # Length -> {(position, letter): bitset of words with that letter at that position}
+        self.positions = {}
+        # Length -> {letter: bitset of words that contain that letter}
+        self.contains = {}
+
+        for length, group in self.by_length.items():
+            positions = {}
+            contains = {}
+            for idx, word in enumerate(group):
+                bit = 1 << idx
+                for pos, char in enumerate(word):
+                    positions[pos, char] = positions.get((pos, char), 0) | bit
+                for char in set(word):
+                    contains[char] = contains.get(char, 0) | bit
+
+            self.positions[length] = positions
+            self.contains[length] = contains
+
+    # Build the index over the words of the given topics in GameData.word_lists
+    @staticmethod
+    def from_word_lists(word_lists, topics=None):
+        topics = word_lists.keys() if topics is None else topics
+        return WordIndex([word for topic in topics for word, hint in word_lists[topic]])
+
+    # Bitset of the words (of the pattern's length) that match the pattern and the tried letters
+    # pattern has '_' for hidden letters, tried is the set of letters already guessed
+    def candidates(self, pattern, tried):
+        length = len(pattern)
+        if length not in self.by_length:
+            return length, 0
+
+        positions = self.positions[length]
+        contains = self.contains[length]
+        bits = (1 << len(self.by_length[length])) - 1
+
+        for pos, char in enumerate(pattern):
+            if char == '_':
+                # A hidden position can't hold a letter that was already tried
+                for letter in tried:
+                    bits &= ~positions.get((pos, letter), 0)
+            else:
+                bits &= positions.get((pos, char), 0)
+
+        # Wrong guesses rule out every word containing them
+        for letter in tried:
+            if letter not in pattern:
+                bits &= ~contains.get(letter, 0)
+
+        return length, bits
+
+    # The words that match the pattern and the tried letters
+    def candidate_words(self, pattern, tried):
+        length, bits = self.candidates(pattern, tried)
+        group = self.by_length.get(length, [])
+        return [word for idx, word in enumerate(group) if bits >> idx & 1]
+
+# Chooses the letter found in the most words that are still possible
+class Solver:
+    def __init__(self, index):
+        self.index = index
+
+    def choose(self, pattern, tried):
+        length, bits = self.index.candidates(pattern, tried)
+
+        best, best_count = None, 0
+        if bits:
+            contains = self.index.contains[length]
+            for letter in ALPHABET:
+                if letter not in tried and letter in contains:
+                    count = popcount(bits & contains[letter])
+                    if count > best_count:
+                        best, best_count = letter, count
+
+        # No word in the index matches, so fall back to common letters
+        if best is None:
+            best = next(letter for letter in FALLBACK_ORDER if letter not in tried)
+        return best
+
+# Play a headless game until it is over, returns True if it was won
+def play(game, solver):
+    while not game.over():
+        game.guess(solver.choose(game.pattern(), game.tried))
+    return game.won()
+
+# Make one move in a GameState, as if the player clicked the chosen letter
+def play_turn(state, solver):
+    state.guess(solver.choose(state.game.pattern(), state.game.tried))
+
+# Benchmark: play every word of every topic and report the speed and win rate
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from os.path import join
+    from time import perf_counter
+    from corpus import find_topics, load_word_lists
+
+    parser = ArgumentParser(description="Benchmark the hangman solver")
+    parser.add_argument('--words', default=join('assets', 'words'), help="folder with the topic CSVs")
+    parser.add_argument('--rounds', type=int, default=1, help="times to play every word")
+    args = parser.parse_args()
+
+    topics = find_topics(args.words)
+    corpus, word_lists = load_word_lists(args.words, topics)
+
+    start = perf_counter()
+    solver = Solver(WordIndex.from_word_lists(word_lists))
+    print(f"Index built in {perf_counter() - start:.3f}s")
+
+    total_guesses = 0
+    total_time = 0
+    for topic in topics:
+        games = wins = guesses = 0
+        start = perf_counter()
+        for _ in range(args.rounds):
+            for word, hint in word_lists[topic]:
+                game = HangmanGame(word, hint)
+                wins += play(game, solver)
+                games += 1
+                guesses += len(game.tried)
+        elapsed = perf_counter() - start
+        total_guesses += guesses
+        total_time += elapsed
+        print(f"{topic:<16} {games:>8} games  {wins / max(games, 1):6.1%} won  "
+            f"{guesses / max(elapsed, 1e-9):>12,.0f} guesses/s")
+
+    print(f"{'All':<16} {total_guesses / max(total_time, 1e-9):>44,.0f} guesses/s")
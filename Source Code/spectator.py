@@ -0,0 +1,335 @@
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from engine import MAX_MISTAKES
+
+# Live games shown by other processes on the same machine, without running the game in them
+#
+# The game writes a compact snapshot of the current round into a ring buffer in shared memory
+# every time the round changes. Viewers poll the buffer for the newest snapshot, and nothing is
+# ever locked, so any number of viewers can read it without slowing down the game. The memory
+# is laid out as:
+#   HEADER   MAGIC, no of slots, size of the topic table, no of snapshots written so far
+#   TOPICS   version (0 while it is being written), length, the topic names (utf-8, one per line)
+#   slots    each one is a sequence no (0 while it is being written) and a SNAPSHOT
+# Snapshot n is in slot n % slots. A reader reads the sequence no, the data and the sequence no
+# again, and only keeps the data if it didn't change in between. This relies on each process
+# seeing the stores of the game in the order they were made, as on x86.
+#
+# A snapshot only names its word by topic id and index, the viewers look the word and hint up in
+# their own copy of the word lists. The topic ids index the topic table with the same version.
+
+MAGIC = b'HANGSPC1'
+
+# Name of the shared memory when none is given
+DEFAULT_NAME = 'hangman_spectator'
+
+HEADER = struct.Struct('<8sIIQ')
+HEAD_OFFSET = 16
+TOPICS_HEADER = struct.Struct('<QI')
+SEQUENCE = struct.Struct('<Q')
+# Game no, topic table version, topic id, word index, mistakes, status, letters not tried yet
+# (bit 0 for a) and the revealed letters of the word (bit n for the nth letter)
+SNAPSHOT = struct.Struct('<IHHIBBI32s')
+SLOT_SIZE = SEQUENCE.size + SNAPSHOT.size
+
+# Most letters of a word that the revealed mask has room for
+MAX_WORD = 32 * 8
+
+# Bytes kept for the names of the topics
+TOPICS_SIZE = 64 * 1024
+
+PLAYING, WON, LOST, CLOSED = range(4)
+
+ALL_LETTERS = (1 << 26) - 1
+LETTER_BITS = {chr(ord('a') + idx): 1 << idx for idx in range(26)}
+
+def memory_size(slots, topics_size):
+    return HEADER.size + topics_size + slots * SLOT_SIZE
+
+# Publishes the game being played for the spectators, used by GameState
+class SpectatorBroadcast:
+    def __init__(self, name=DEFAULT_NAME, slots=64):
+        self.slots = slots
+        size = memory_size(slots, TOPICS_SIZE)
+        try:
+            self.memory = SharedMemory(name, create=True, size=size)
+            head = 0
+        except FileExistsError:
+            # Left behind by a game that didn't close it, viewers may still be attached to it
+            self.memory = SharedMemory(name)
+            magic, old_slots, old_topics_size, head = HEADER.unpack_from(self.memory.buf)
+            if self.memory.size < size:
+                self.memory.close()
+                self.memory.unlink()
+                self.memory = SharedMemory(name, create=True, size=size)
+                head = 0
+            elif magic != MAGIC or (old_slots, old_topics_size) != (slots, TOPICS_SIZE):
+                head = 0
+        self.buf = self.memory.buf
+        self.topics_offset = HEADER.size
+        self.slots_offset = HEADER.size + TOPICS_SIZE
+
+        # Snapshots written so far, and the no of the game being played
+        self.head = head
+        self.games = 0
+        # Version of the topic table in the buffer, and the id of the topic being played
+        self.topics_version = 0
+        self.words_version = None
+        self.topic_id = 0
+        self.index = 0
+        # Revealed mask of the word before any guess, and the mask of each of its letters
+        self.shown = 0
+        self.positions = {}
+
+        TOPICS_HEADER.pack_into(self.buf, self.topics_offset, 0, 0)
+        HEADER.pack_into(self.buf, 0, MAGIC, slots, TOPICS_SIZE, head)
+
+    # Write the names of the topics, only when they changed since the last game
+    def write_topics(self, topics):
+        names = '\n'.join(topics).encode('utf-8')
+        if len(names) > TOPICS_SIZE - TOPICS_HEADER.size:
+            raise ValueError(f"{len(topics)} topic names don't fit in the spectator buffer")
+        version = self.topics_version % 0xffff + 1
+
+        TOPICS_HEADER.pack_into(self.buf, self.topics_offset, 0, len(names))
+        start = self.topics_offset + TOPICS_HEADER.size
+        self.buf[start:start + len(names)] = names
+        TOPICS_HEADER.pack_into(self.buf, self.topics_offset, version, len(names))
+        self.topics_version = version
+
+    # Called when a round starts, with the topics of GameData and the word's topic and index
+    def start_game(self, topics, words_version, topic, index, game):
+        if words_version != self.words_version:
+            self.write_topics(topics)
+            self.words_version = words_version
+        self.games += 1
+        self.topic_id = topics.index(topic)
+        self.index = index
+
+        # The word is only gone through once a round, a guess then reveals the positions of its letter
+        self.shown = 0
+        self.positions = {}
+        for idx, (letter, guess) in enumerate(zip(game.word[:MAX_WORD], game.guessed)):
+            if letter == guess:
+                self.shown |= 1 << idx
+            else:
+                self.positions[letter] = self.positions.get(letter, 0) | 1 << idx
+        self.publish(game)
+
+    # Called after every guess, takes a few microseconds
+    def publish(self, game):
+        status = WON if game.won() else LOST if game.lost() else PLAYING
+        revealed = self.shown
+        tried = 0
+        for letter in game.tried:
+            tried |= LETTER_BITS.get(letter, 0)
+            revealed |= self.positions.get(letter, 0)
+
+        self.write(self.games, self.topics_version, self.topic_id, self.index,
+            min(game.mistakes, MAX_MISTAKES), status, ALL_LETTERS & ~tried, revealed.to_bytes(32, 'little'))
+
+    # Write the fields of a SNAPSHOT into the next slot
+    def write(self, *fields):
+        sequence = self.head + 1
+        offset = self.slots_offset + (sequence % self.slots) * SLOT_SIZE
+        SEQUENCE.pack_into(self.buf, offset, 0)
+        SNAPSHOT.pack_into(self.buf, offset + SEQUENCE.size, *fields)
+        SEQUENCE.pack_into(self.buf, offset, sequence)
+        SEQUENCE.pack_into(self.buf, HEAD_OFFSET, sequence)
+        self.head = sequence
+
+    # Tell the viewers the game has ended, and remove the shared memory
+    def close(self):
+        self.write(self.games, self.topics_version, 0, 0, 0, CLOSED, 0, bytes(32))
+        self.memory.close()
+        self.memory.unlink()
+
+# A snapshot read back from the buffer
+class Snapshot:
+    def __init__(self, sequence, game, topics_version, topic_id, index, mistakes, status, letters, revealed):
+        self.sequence = sequence
+        self.game = game
+        self.topics_version = topics_version
+        self.topic_id = topic_id
+        self.index = index
+        self.mistakes = mistakes
+        self.status = status
+        self.letters = letters
+        self.revealed = int.from_bytes(revealed, 'little')
+
+    # The letters that were not tried yet
+    def remaining(self):
+        return [chr(ord('a') + idx) for idx in range(26) if self.letters >> idx & 1]
+
+    # The word with dashes for the letters that are still hidden, like HangmanGame.pattern
+    def pattern(self, word):
+        return ''.join(letter if self.revealed >> idx & 1 else '_' for idx, letter in enumerate(word))
+
+# Reads the snapshots of a SpectatorBroadcast from another process
+# Raises FileNotFoundError when no game is broadcasting under the name
+class SpectatorReader:
+    def __init__(self, name=DEFAULT_NAME):
+        self.memory = SharedMemory(name)
+        # Only the game removes the shared memory, the resource tracker would remove it when
+        # this process exits
+        resource_tracker.unregister(self.memory._name, 'shared_memory')
+        self.buf = self.memory.buf
+
+        magic, self.slots, topics_size, _ = HEADER.unpack_from(self.buf)
+        if magic != MAGIC or self.memory.size < memory_size(self.slots, topics_size):
+            self.close()
+            raise ValueError(f"{name} is not a hangman spectator buffer")
+        self.topics_offset = HEADER.size
+        self.slots_offset = HEADER.size + topics_size
+
+    # The newest snapshot, or None if there is none yet or it was being written
+    def latest(self):
+        head, = SEQUENCE.unpack_from(self.buf, HEAD_OFFSET)
+        if head == 0:
+            return None
+        offset = self.slots_offset + (head % self.slots) * SLOT_SIZE
+        if SEQUENCE.unpack_from(self.buf, offset)[0] != head:
+            return None
+        fields = SNAPSHOT.unpack_from(self.buf, offset + SEQUENCE.size)
+        if SEQUENCE.unpack_from(self.buf, offset)[0] != head:
+            return None
+        return Snapshot(head, *fields)
+
+    # (version, names) of the topic table, or None if it was being written
+    def topics(self):
+        version, length = TOPICS_HEADER.unpack_from(self.buf, self.topics_offset)
+        start = self.topics_offset + TOPICS_HEADER.size
+        names = bytes(self.buf[start:start + length])
+        if version == 0 or TOPICS_HEADER.unpack_from(self.buf, self.topics_offset) != (version, length):
+            return None
+        return version, names.decode('utf-8').split('\n') if names else []
+
+    def close(self):
+        self.memory.close()
+
+# Show the games broadcast under name in a window, with the word lists in words_dir
+def view(name, words_dir):
+    import pygame as pg
+    from os.path import join
+    from corpus import load_word_lists
+    from gui import GUI, Label, Button
+    from sprites import load_sheet, SpriteAtlas, blank_atlas, MISTAKE_FRAMES
+
+    # How often the buffer is checked for a new snapshot, and for a game to start broadcasting
+    POLL_MS = 50
+    ATTACH_MS = 1000
+
+    pg.display.init()
+    pg.font.init()
+    clock = pg.time.Clock()
+    screen = pg.display.set_mode((800, 600))
+    pg.display.set_caption("Hangman spectator")
+    pg.event.set_blocked(None)
+    pg.event.set_allowed([pg.QUIT, pg.VIDEOEXPOSE])
+
+    # The same assets and layout as GameState
+    try:
+        GUI.default_font = pg.font.Font(join('assets', 'fonts', 'RobotoMono-Regular.ttf'), 24)
+    except OSError:
+        GUI.default_font = pg.font.Font(None, 30)
+    try:
+        sprite = SpriteAtlas(*load_sheet(join('assets', 'sprites', 'hangman.json')))
+    except (OSError, ValueError, KeyError, pg.error):
+        sprite = blank_atlas()
+    sprite_rect = pg.Rect(100, 100, 120, 180)
+    letter_btns = {}
+    for y in range(2):
+        for x in range(13):
+            char = chr(ord('a') + y * 13 + x)
+            letter_btns[char] = Button(pg.Rect(50 + x * 55, 350 + y * 55, 50, 50), char)
+    status_txt = Label(pg.Rect(200, 500, 400, 50), '')
+
+    reader = None
+    attach_at = 0
+    # Sequence no of the snapshot on the screen, None for the waiting screen and -1 for nothing yet
+    shown = -1
+    topics_version = None
+    topics = []
+    word_lists = {}
+    widgets = []
+    frame = None
+
+    running = True
+    redraw = True
+    while running:
+        for event in [pg.event.wait(POLL_MS)] + pg.event.get():
+            if event.type == pg.QUIT:
+                running = False
+            elif event.type == pg.VIDEOEXPOSE:
+                redraw = True
+
+        if reader is None and pg.time.get_ticks() >= attach_at:
+            try:
+                reader = SpectatorReader(name)
+            except (FileNotFoundError, ValueError):
+                attach_at = pg.time.get_ticks() + ATTACH_MS
+
+        snapshot = reader.latest() if reader else None
+        if snapshot and snapshot.status == CLOSED:
+            reader.close()
+            reader = None
+            snapshot = None
+        if snapshot and snapshot.topics_version != topics_version:
+            # The game's topics changed, so load the words of its new topics
+            table = reader.topics()
+            if table is None:
+                # Being written, try again on the next poll
+                continue
+            topics_version, topics = table
+            try:
+                word_lists = load_word_lists(words_dir, topics)[1]
+            except (OSError, ValueError) as error:
+                print(f"Could not load the word lists: {error}")
+                word_lists = {}
+
+        if (snapshot.sequence if snapshot else None) != shown:
+            shown = snapshot.sequence if snapshot else None
+            try:
+                word, hint = word_lists[topics[snapshot.topic_id]][snapshot.index]
+            except (AttributeError, IndexError, KeyError):
+                word = None
+            if word is None:
+                status_txt.set_text("Waiting for a game...")
+                widgets = [status_txt]
+                frame = None
+            else:
+                width = 50 + len(word) * 15
+                guess_txt = Label(pg.Rect(500 - width / 2, 100, width, 50), snapshot.pattern(word))
+                width = 50 + len(hint) * 15
+                hint_txt = Label(pg.Rect(500 - width / 2, 200, width, 50), hint)
+                status_txt.set_text(f"Game {snapshot.game}" + {WON: ", won", LOST: ", lost"}.get(snapshot.status, ''))
+                widgets = [guess_txt, hint_txt, status_txt] + [letter_btns[char] for char in snapshot.remaining()]
+                frame = {WON: 'won', LOST: 'lost'}.get(snapshot.status, MISTAKE_FRAMES[snapshot.mistakes])
+            redraw = True
+
+        # Only changes are drawn, most polls find the same snapshot
+        if redraw:
+            redraw = False
+            screen.fill((245, 245, 220))
+            for widget in widgets:
+                widget.render(screen)
+            if frame:
+                screen.blit(sprite.frame(frame), sprite_rect)
+            pg.display.flip()
+        clock.tick(60)
+
+    if reader:
+        reader.close()
+    pg.quit()
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from os.path import join
+
+    parser = ArgumentParser(description="Watch the games of a hangman game started with --broadcast")
+    parser.add_argument('--name', default=DEFAULT_NAME, help="name the game broadcasts under")
+    parser.add_argument('--words', default=join('assets', 'words'), help="folder with the topic CSVs")
+    args = parser.parse_args()
+
+    view(args.name, args.words)
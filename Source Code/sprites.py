@@ -0,0 +1,50 @@
+import json
+import pygame as pg
+from os.path import join, dirname
+
+# Names of the hangman frames for 0 to 6 mistakes
+MISTAKE_FRAMES = [f'mistake_{idx}' for idx in range(7)]
+
+# Every frame the game draws
+FRAME_NAMES = MISTAKE_FRAMES + ['idle', 'won', 'lost']
+
+# Read a spritesheet and the metadata file that names its frames
+# Safe to call from a loading thread, the sheet is converted later by SpriteAtlas
+def load_sheet(meta_path):
+    with open(meta_path) as meta_file:
+        meta = json.load(meta_file)
+    image = pg.image.load(join(dirname(meta_path), meta['image']))
+    return image, {name: pg.Rect(rect) for name, rect in meta['frames'].items()}
+
+# A spritesheet converted to the display's pixel format, with named frames kept as subsurfaces
+# Scaled copies of the frames are made once and cached, for windows of other sizes
+class SpriteAtlas:
+    def __init__(self, image, frames):
+        # Converting once means blits never have to convert pixels
+        self.sheet = image.convert_alpha()
+        self.frames = {name: self.sheet.subsurface(rect) for name, rect in frames.items()}
+        self.scaled = {}
+
+    def frame(self, name, scale=1):
+        if scale == 1:
+            return self.frames[name]
+
+        key = (name, scale)
+        surface = self.scaled.get(key)
+        if surface is None:
+            surface = self.scaled[key] = self.scale_frame(self.frames[name], scale)
+        return surface
+
+    @staticmethod
+    def scale_frame(surface, scale):
+        size = (round(surface.get_width() * scale), round(surface.get_height() * scale))
+        return pg.transform.smoothscale(surface, size)
+
+    # Make the scaled copies of every frame ahead of time
+    def prescale(self, scale):
+        for name in self.frames:
+            self.frame(name, scale)
+
+# An atlas with an empty frame for every name, used when the spritesheet can't be loaded
+def blank_atlas(size=(120, 180)):
+    return SpriteAtlas(pg.Surface(size, pg.SRCALPHA), {name: pg.Rect((0, 0), size) for name in FRAME_NAMES})
@@ -1,144 +1,472 @@
 import pygame as pg
-from gui import *
+from gui import GUI, Label, Textbox, Button, ToggleButton, VirtualList, EventDispatcher
 from os.path import join
-from csv import reader
-from random import choice
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from engine import HangmanGame
+from corpus import open_corpus, read_csv, find_topics
+from random import Random
+from sampler import WordSampler
+from search import SearchIndex, PrefixSearch
+from difficulty import read_all_scores
+from sprites import load_sheet, SpriteAtlas, MISTAKE_FRAMES, blank_atlas
 
 # Base class / template for all states
 class State:
-    # Function to prepare the state
+    def __init__(self):
+        # Regions of the screen that changed outside of any widget (None is the whole screen)
+        self.invalid_rects = [None]
+        # Ticks at which the state wants a frame even if nothing else happens
+        self.timers = []
+
+    # Function to prepare the state, only called the first time it is entered
     def load(self):
         pass
+    # Function to get the state ready each time it is entered
+    def reset(self):
+        pass
     # Function to handle all the events
     def update(self, event):
         pass
     # Function to draw everything to the screen
     def render(self, screen):
         pass
+    # Function called once per frame, before drawing
+    def tick(self):
+        pass
+    # Function to list the widgets of the state, so their changes can be found
+    def widgets(self):
+        return []
+
+    # Function to tell if the state changes every frame, so the game can't wait for events
+    def is_animating(self):
+        return False
+    # Function called when the word lists were reloaded while the state is shown
+    def words_changed(self):
+        pass
+
+    # Mark a region of the screen as changed, or the whole screen if no rect is given
+    def invalidate(self, rect=None):
+        self.invalid_rects.append(rect)
+
+    # Ask for a frame in delay milliseconds, even if no event comes before then
+    def add_timer(self, delay):
+        self.timers.append(pg.time.get_ticks() + delay)
+
+    # The ticks of the next timer or widget animation, or None if the state only changes on events
+    def next_deadline(self):
+        ticks = pg.time.get_ticks()
+        self.timers = [deadline for deadline in self.timers if deadline > ticks]
+        deadlines = [elem.next_deadline() for elem in self.widgets()] + self.timers
+        return min((deadline for deadline in deadlines if deadline is not None), default=None)
+
+    # Function to collect the regions of the screen that need to be redrawn this frame
+    def dirty_rects(self, screen):
+        rects = self.invalid_rects
+        self.invalid_rects = []
+
+        ticks = pg.time.get_ticks()
+        for elem in self.widgets():
+            elem.tick(ticks)
+            if elem.dirty:
+                rects.append(elem.dirty_rect())
+                elem.dirty = False
+
+        # The whole screen is being redrawn anyway
+        if None in rects:
+            return [screen.get_rect()]
+        return rects
 
 # State that handles the loading of all assets
+# Assets are loaded in a thread pool while a progress bar is shown
 class LoadState(State):
     def load(self):
-        # Load the fonts and sprites and store them in the shared data
-        self.data.small_font = pg.font.Font(join('assets', 'fonts', 'RobotoMono-Regular.ttf'), 24)
-        self.data.large_font = pg.font.Font(join('assets', 'fonts', 'RobotoMono-Regular.ttf'), 32)
-        self.data.hangman_sprite = pg.image.load(join('assets', 'sprites', 'hangman.png'))
-        
-        # Go through all the topics
-        for topic in self.data.all_topics:
-            # Open the file and read the contents
-            with open(join('assets', 'words', topic + '.csv')) as words_file:
-                csv_reader = reader(words_file, delimiter='|')
-                # Store the words and hints, arranged by topic
-                self.data.word_lists[topic] = list(csv_reader)
+        self.words_dir = join('assets', 'words')
+
+        # Futures that have not been collected yet, with the asset name and where to store the result
+        self.pool = ThreadPoolExecutor()
+        self.pending = {}
+        self.total = 0
+        self.errors = []
+        self.started = False
+        self.waited_frame = False
+        self.finished = False
+
+        # The progress bar, and a plain font to draw it with until the real fonts are loaded
+        self.bar_rect = pg.Rect(200, 280, 400, 40)
+        self.text_rect = pg.Rect(200, 220, 400, 40)
+        self.status_font = pg.font.Font(None, 32)
+        self.error_txts = []
+        self.continue_btn = None
+
+    # Function to start loading every asset, called once the first frame is on screen
+    def start(self):
+        self.started = True
+
+        # Every CSV in the words folder is a topic, all of them are selected to start with
+        self.data.all_topics = find_topics(self.words_dir)
+        self.data.current_topics = self.data.all_topics.copy()
+        font_path = join('assets', 'fonts', 'RobotoMono-Regular.ttf')
+
+        # Load the fonts and sprites and the compiled word corpus
+        self.submit("fonts", self.store_fonts, self.load_fonts, font_path)
+        self.submit("hangman sprite", self.store_sprite, load_sheet, join('assets', 'sprites', 'hangman.json'))
+        self.submit("word corpus", self.store_corpus, open_corpus, self.words_dir, self.data.all_topics)
+        self.submit("word difficulty", self.store_difficulty, read_all_scores, self.words_dir, self.data.all_topics)
+
+    # Function to start loading an asset in the thread pool
+    def submit(self, name, store, func, *args):
+        self.pending[self.pool.submit(func, *args)] = (name, store)
+        self.total += 1
+
+    # Both sizes are opened by one task: SDL_ttf shares one FreeType library between its fonts,
+    # and FreeType can't open two faces on it from different threads at the same time
+    @staticmethod
+    def load_fonts(path):
+        return pg.font.Font(path, 24), pg.font.Font(path, 32)
+
+    def store_fonts(self, fonts):
+        self.data.small_font, self.data.large_font = fonts
+
+    def store_sprite(self, sheet):
+        # Converting to the display format has to happen on the main thread
+        self.data.hangman_sprite = SpriteAtlas(*sheet)
+
+    def store_corpus(self, corpus):
+        self.data.corpus = corpus
+        if corpus:
+            # Its entries are only decoded when a word is drawn
+            for topic in self.data.all_topics:
+                self.data.word_lists[topic] = corpus.topics[topic]
+        else:
+            # The compiled corpus is missing or stale, so read all the CSVs instead
+            for topic in self.data.all_topics:
+                self.submit(topic + " words", lambda words, topic=topic: self.store_words(topic, words),
+                    read_csv, join(self.words_dir, topic + '.csv'))
+
+    def store_difficulty(self, scores):
+        self.data.difficulty_scores = scores
+
+    def store_words(self, topic, words):
+        # Store the words and hints, arranged by topic
+        self.data.word_lists[topic] = words
+
+    # Function called once per frame to collect the assets that finished loading
+    def tick(self):
+        if self.finished:
+            return
+        # The first tick comes before the first frame is drawn, so the loading threads
+        # are started on the next one and don't slow down the first frame
+        if not self.started:
+            if self.waited_frame:
+                self.start()
+            self.waited_frame = True
+            return
+
+        for future in [future for future in self.pending if future.done()]:
+            name, store = self.pending.pop(future)
+            try:
+                store(future.result())
+            except Exception as error:
+                self.errors.append((name, error))
+            self.invalidate(self.bar_rect.inflate(4, 4))
+            self.invalidate(self.text_rect)
+
+        if not self.pending:
+            self.finish()
+
+    # The finished assets are only collected in tick, so it has to run every frame until then
+    def is_animating(self):
+        return not self.finished
+
+    # Function called when every asset has either loaded or failed
+    def finish(self):
+        self.finished = True
+        self.pool.shutdown(wait=False)
+
+        # Replace the assets that failed to load, so the game can still run
+        if self.data.small_font is None:
+            self.data.small_font = pg.font.Font(None, 30)
+        if self.data.large_font is None:
+            self.data.large_font = pg.font.Font(None, 40)
+        if self.data.hangman_sprite is None:
+            self.data.hangman_sprite = blank_atlas()
+        for topic in [topic for topic in self.data.all_topics if topic not in self.data.word_lists]:
+            self.data.all_topics.remove(topic)
+            if topic in self.data.current_topics:
+                self.data.current_topics.remove(topic)
 
         # Set the default font for the user interface
         GUI.default_font = self.data.small_font
 
-        # Finished loading, now go to the home/menu screen
-        self.state_machine.switch_state(HomeState())
+        # Words are drawn from the selected topics by the sampler
+        self.data.sampler = WordSampler(self.data.word_lists, Random(self.data.seed), self.data.difficulty_scores)
+        try:
+            self.data.sampler.select(self.data.current_topics)
+            self.data.sampler.set_band(self.data.difficulty)
+        except ValueError as error:
+            self.errors.append(("word lists", error))
+
+        if self.errors:
+            # Show what failed, and let the player continue
+            for idx, (name, error) in enumerate(self.errors[:6]):
+                self.error_txts.append(Label(pg.Rect(50, 350 + idx * 25, 700, 25),
+                    f"Could not load {name}: {error}"[:46], border_size=0, back_color=(245, 245, 220)))
+            self.continue_btn = Button(pg.Rect(325, 520, 150, 50), "Continue")
+            self.invalidate()
+        else:
+            # Finished loading, now go to the home/menu screen
+            self.state_machine.switch_state(HomeState)
+
+    def update(self, event):
+        if self.continue_btn:
+            self.continue_btn.update(event)
+            if self.continue_btn.clicked:
+                self.state_machine.switch_state(HomeState)
+                self.continue_btn.click_handled()
+
+    def widgets(self):
+        return self.error_txts + ([self.continue_btn] if self.continue_btn else [])
+
+    def render(self, screen):
+        done = self.total - len(self.pending)
+        text = self.status_font.render(f"Loading... {done}/{self.total}", True, (0, 0, 0))
+        screen.blit(text, text.get_rect(center=self.text_rect.center))
+
+        # Draw the progress bar
+        pg.draw.rect(screen, (0, 0, 0), self.bar_rect.inflate(4, 4))
+        pg.draw.rect(screen, (255, 255, 255), self.bar_rect)
+        filled = self.bar_rect.copy()
+        filled.width = self.bar_rect.width * done // max(self.total, 1)
+        pg.draw.rect(screen, (100, 100, 100), filled)
+
+        for elem in self.widgets():
+            elem.render(screen)
 
 # State that shows the main menu of the game
 class HomeState(State):
     def load(self):
         # Create a heading, and buttons for playing the game and selecting the topics
         self.title = Label(pg.Rect(300, 75, 200, 75), "Hangman", font=self.data.large_font)
-        self.play_btn = Button(pg.Rect(225, 450, 150, 50), "Play")
-        self.topics_btn = Button(pg.Rect(425, 450, 150, 50), "Topics")
+        self.play_btn = Button(pg.Rect(150, 450, 150, 50), "Play")
+        self.topics_btn = Button(pg.Rect(325, 450, 150, 50), "Topics")
+        self.search_btn = Button(pg.Rect(500, 450, 150, 50), "Search")
+        self.dispatcher = EventDispatcher([self.play_btn, self.topics_btn, self.search_btn])
+
+    def reset(self):
+        self.dispatcher.reset()
+        self.enable_play()
+
+    def words_changed(self):
+        self.enable_play()
+
+    # There is nothing to play until some selected topic has words (like with an empty words folder)
+    def enable_play(self):
+        self.play_btn.set_enabled(bool(self.data.sampler.topics))
 
     def update(self, event):
         # Update the buttons and check for button clicks
-        for elem in [self.play_btn, self.topics_btn]:
-            elem.update(event)
-        
+        self.dispatcher.dispatch(event)
+
         if self.play_btn.clicked:
             # If 'play' is clicked, go to the game
-            self.state_machine.switch_state(GameState())
+            self.state_machine.switch_state(GameState)
             self.play_btn.click_handled()
         elif self.topics_btn.clicked:
             # If 'topics' is clicked, let the user select the topics
-            self.state_machine.switch_state(TopicsState())
+            self.state_machine.switch_state(TopicsState)
             self.topics_btn.click_handled()
+        elif self.search_btn.clicked:
+            # If 'search' is clicked, let the user look through the words and hints
+            self.state_machine.switch_state(SearchState)
+            self.search_btn.click_handled()
+
+    def widgets(self):
+        return [self.title, self.play_btn, self.topics_btn, self.search_btn]
 
     def render(self, screen):
         # Draw all the ui elements
-        for elem in [self.title, self.play_btn, self.topics_btn]:
+        for elem in [self.title, self.play_btn, self.topics_btn, self.search_btn]:
             elem.render(screen)
 
-        screen.blit(self.data.hangman_sprite, pg.Rect(350, 200, 120, 180), pg.Rect(720, 0, 120, 180))
+        screen.blit(self.data.hangman_sprite.frame('idle'), (350, 200))
 
 # State the lets the user select topics for the game
 class TopicsState(State):
+    INSTRUCTIONS = "Select the topics for the words:"
+
     def load(self):
         # Create a heading and a Done button
-        self.instr_txt = Label(pg.Rect(150, 80, 500, 50), "Select the topics for the words:")
+        self.instr_txt = Label(pg.Rect(150, 80, 500, 50), self.INSTRUCTIONS)
         self.done_btn = Button(pg.Rect(350, 475, 100, 50), "Done")
 
-        # Create toggle buttons (on/off switches) for all the topics
-        self.topic_btns = [
-            ToggleButton(pg.Rect(175, 225, 150, 50), self.data.all_topics[0]), # Computer
-            ToggleButton(pg.Rect(475, 225, 150, 50), self.data.all_topics[1]), # English
-            ToggleButton(pg.Rect(175, 325, 150, 50), self.data.all_topics[2]), # Physics
-            ToggleButton(pg.Rect(475, 325, 150, 50), self.data.all_topics[3]) # Chemistry
-        ]
+        # Topics that are switched on, kept apart from the toggle buttons as the buttons are reused
+        self.selected = set()
+
+        # A scrolling grid of toggle buttons (on/off switches), one for each topic in view
+        self.topic_list = VirtualList(pg.Rect(96, 150, 608, 300), len(self.data.all_topics), (200, 60),
+            lambda: ToggleButton(pg.Rect(0, 0, 0, 0), ''), self.bind_topic)
+
+        self.dispatcher = EventDispatcher([self.done_btn, self.topic_list])
+
+    # Show a topic on a toggle button of the list
+    def bind_topic(self, btn, idx):
+        topic = self.data.all_topics[idx]
+        btn.toggled = topic in self.selected
+        btn.set_text(topic)
+
+    def reset(self):
+        self.dispatcher.reset()
+
+        # The topics that were already selected start 'on'
+        self.selected = set(self.data.current_topics)
+        self.instr_txt.set_text(self.INSTRUCTIONS)
+        self.topic_list.set_count(len(self.data.all_topics))
 
-        # Go through all the topics
-        for btn in self.topic_btns:
-            # If this topic was already selected, turn the button 'on'
-            if btn.text in self.data.current_topics:
-                btn.toggled = True
+    def words_changed(self):
+        # Topics may have been added or removed
+        self.selected &= set(self.data.all_topics)
+        self.topic_list.set_count(len(self.data.all_topics))
 
     def update(self, event):
         # Update all the buttons
-        self.done_btn.update(event)
-        for btn in self.topic_btns:
-            btn.update(event)
-        
+        self.dispatcher.dispatch(event)
+
+        # Remember the topics switched on or off
+        for idx, btn in self.topic_list.visible_cells():
+            topic = self.data.all_topics[idx]
+            if btn.toggled:
+                self.selected.add(topic)
+            else:
+                self.selected.discard(topic)
+
         # If the Done button is clicked AND atleast one topic has been selected
         # (if no topic is selected, this does not run)
-        if self.done_btn.clicked and any([btn.toggled for btn in self.topic_btns]):
-            # Reset the currently selected topics
-            self.data.current_topics.clear()
-            # Go through all the toggle buttons
-            for btn in self.topic_btns:
-                if btn.toggled:
-                    # Add this topic to the current topics list
-                    self.data.current_topics.append(btn.text)
+        if self.done_btn.clicked and self.selected:
+            self.done_btn.click_handled()
+            # The selected topics, in the order of all topics
+            topics = [topic for topic in self.data.all_topics if topic in self.selected]
+            try:
+                self.data.sampler.select(topics)
+            except ValueError:
+                # None of them has words (of the chosen difficulty), so stay until others are selected
+                self.instr_txt.set_text("No words of this difficulty there" if self.data.sampler.band
+                    else "No words in these topics")
+                return
+            self.data.current_topics[:] = topics
 
             # Selected the topics, now go back the menu
-            self.state_machine.switch_state(HomeState())
-            self.done_btn.click_handled()
+            self.state_machine.switch_state(HomeState)
+
+    def widgets(self):
+        return [self.instr_txt, self.done_btn, self.topic_list]
 
     def render(self, screen):
         # Draw the user interface
-        for elem in [self.instr_txt, self.done_btn]:
+        for elem in [self.instr_txt, self.done_btn, self.topic_list]:
+            elem.render(screen)
+
+# State to search the words and hints of every topic, for checking the word lists
+class SearchState(State):
+    # Longest result shown, longer ones are cut short
+    MAX_RESULT_CHARS = 40
+
+    def load(self):
+        # A box to type the search in, the matches, and a Back button
+        self.search_box = Textbox(pg.Rect(100, 40, 600, 50), '')
+        self.results = VirtualList(pg.Rect(100, 110, 600, 360), 0, (592, 40),
+            lambda: Label(pg.Rect(0, 0, 0, 0), '', border_size=0), self.bind_result, spacing=4)
+        self.status_txt = Label(pg.Rect(100, 490, 400, 40), '')
+        self.back_btn = Button(pg.Rect(550, 490, 150, 40), "Back")
+
+        # The search index is built on a thread, as it takes a while for big word lists
+        self.pool = ThreadPoolExecutor(1)
+        self.build_index()
+
+        self.dispatcher = EventDispatcher([self.search_box, self.results, self.back_btn])
+
+    # Start building the search index over the current word lists
+    def build_index(self):
+        # The thread gets its own copy of the topics, as they can be reloaded while it runs
+        self.index_future = self.pool.submit(SearchIndex, dict(self.data.word_lists))
+        self.index_version = self.data.words_version
+        self.search = None
+        self.results.set_count(0)
+        self.status_txt.set_text("Indexing the words...")
+
+    def reset(self):
+        self.dispatcher.reset()
+
+        # Typing goes straight into the search box
+        self.search_box.focused = True
+        self.search_box.mark_dirty()
+
+        # The word lists were reloaded since the index was built
+        if self.index_version != self.data.words_version:
+            self.build_index()
+
+    def words_changed(self):
+        self.build_index()
+
+    # Show a match on a label of the list
+    def bind_result(self, label, idx):
+        topic, entry_idx, word, hint = self.search.result(idx)
+        text = f"{word} - {hint} ({topic})"
+        if len(text) > SearchState.MAX_RESULT_CHARS:
+            text = text[:SearchState.MAX_RESULT_CHARS - 3] + "..."
+        label.set_text(text)
+
+    # Find the matches for the text in the search box
+    def run_search(self):
+        start = perf_counter()
+        self.search.set_prefix(self.search_box.text)
+        count = self.search.count()
+        elapsed = perf_counter() - start
+
+        # The count changes first, so no row is bound to a match past the new count
+        self.results.set_count(count)
+        self.results.scroll_to(0)
+        self.status_txt.set_text(f"{count:,} matches in {elapsed * 1000:.2f} ms")
+
+    def tick(self):
+        if self.search is None and self.index_future.done():
+            self.search = PrefixSearch(self.index_future.result())
+            self.run_search()
+
+    # The index is only collected in tick, so it has to run every frame until then
+    def is_animating(self):
+        return self.search is None
+
+    def update(self, event):
+        self.dispatcher.dispatch(event)
+
+        # Each key typed only searches inside the matches of the text before it
+        if self.search and self.search_box.text.lower() != self.search.prefix:
+            self.run_search()
+
+        if self.back_btn.clicked:
+            self.state_machine.switch_state(HomeState)
+            self.back_btn.click_handled()
+
+    def widgets(self):
+        return [self.search_box, self.results, self.status_txt, self.back_btn]
+
+    def render(self, screen):
+        for elem in [self.search_box, self.results, self.status_txt, self.back_btn]:
             elem.render(screen)
-        for btn in self.topic_btns:
-            btn.render(screen)
 
 # State to play the actual game
 class GameState(State):
     def load(self):
-        # Randomly select a topic, then randomly select a word from that topic
-        self.word, self.hint = choice(self.data.word_lists[choice(self.data.current_topics)])
-        self.word = list(self.word)
-        
-        # Store the no of wrong guesses
-        self.mistakes = 0
-        
-        # List to store the current guess of the player
-        self.guessed = [c if c == ' ' else '_' for c in self.word]
+        # Text to show the guess (dashes) and the hint for the word, filled in for each round
+        self.guess_txt = Label(pg.Rect(0, 100, 0, 50), '')
+        self.hint_txt = Label(pg.Rect(0, 200, 0, 50), '')
 
-        # Text to show the guess (dashes)
-        width = 50 + len(self.word) * 15
-        self.guess_txt = Label(pg.Rect(500 - width / 2, 100, width, 50), ''.join(self.guessed))
-        
-        # Text to show the hint for the word
-        width = 50 + len(self.hint) * 15
-        self.hint_txt = Label(pg.Rect(500 - width / 2, 200, width, 50), self.hint)
+        # Where the hangman is drawn
+        self.sprite_rect = pg.Rect(100, 100, 120, 180)
 
         # Create all the buttons for A-Z and store them in a list
-        self.alphabet_btns = []
+        self.all_alphabet_btns = []
         top_left = (50, 350)
         btn_size = (50, 50)
         padding = 5
@@ -147,52 +475,122 @@ class GameState(State):
                 char = chr(ord('a') + y * 13 + x)
                 pos = (top_left[0] + x * (btn_size[0] + padding), top_left[1] + y * (btn_size[1] + padding))
                 btn = Button(pg.Rect(pos, btn_size), char)
-                self.alphabet_btns.append(btn)
+                self.all_alphabet_btns.append(btn)
+
+        self.alphabet_btns = self.all_alphabet_btns.copy()
+
+        # Mouse events only go to the buttons under the cursor
+        self.dispatcher = EventDispatcher(self.all_alphabet_btns)
+
+    def reset(self):
+        # Draw a word from the selected topics, without repeats until every word was used
+        topic, idx = self.data.sampler.draw_index()
+        word, hint = self.data.word_lists[topic][idx]
+        if self.data.journal:
+            self.data.journal.start_game(topic, idx)
+
+        # Remember the topic and when the round started, for the statistics
+        self.topic = topic
+        self.started = perf_counter()
+
+        # The rules of the game are handled by the engine, this state only shows them
+        self.game = HangmanGame(word, hint)
+        if self.data.spectators:
+            self.data.spectators.start_game(self.data.all_topics, self.data.words_version, topic, idx, self.game)
+
+        # Resize the texts to fit the new word and hint
+        width = 50 + len(self.word) * 15
+        self.guess_txt.rect = pg.Rect(500 - width / 2, 100, width, 50)
+        self.guess_txt.set_text(self.game.pattern())
+
+        width = 50 + len(self.hint) * 15
+        self.hint_txt.rect = pg.Rect(500 - width / 2, 200, width, 50)
+        self.hint_txt.set_text(self.hint)
+
+        # Bring back the buttons removed in the last round
+        for btn in self.all_alphabet_btns:
+            if btn not in self.alphabet_btns:
+                self.dispatcher.add(btn)
+        self.alphabet_btns = self.all_alphabet_btns.copy()
+        self.dispatcher.reset()
 
     def update(self, event):
         # Update and check if a button was clicked
         # if yes, check the guess and delete the button
 
         selected_btn = None
-        for btn in self.alphabet_btns:
-            btn.update(event)
+        for btn in self.dispatcher.dispatch(event):
             if btn.clicked:
                 # If this button was clicked, store it
                 selected_btn = btn
                 btn.click_handled()
 
-        # If a button was clicked and stored, check the letter, then remove the button
+        # If a button was clicked and stored, make the guess
         if selected_btn:
-            self.place_char(selected_btn.text)
-            self.alphabet_btns.remove(selected_btn)
-            self.check_win()
+            self.guess(selected_btn.text)
+
+    # Function to guess a letter: check it, then remove its button
+    # (also used by the solver to play the game)
+    def guess(self, char):
+        for btn in self.alphabet_btns:
+            if btn.text == char:
+                if self.data.journal:
+                    self.data.journal.guess(char)
+                self.place_char(char)
+                if self.data.spectators:
+                    self.data.spectators.publish(self.game)
+                self.alphabet_btns.remove(btn)
+                self.dispatcher.remove(btn)
+                self.invalidate(btn.dirty_rect())
+                self.check_win()
+                return
         
+    # The word, hint, current guess and mistakes are all kept by the engine
+    @property
+    def word(self):
+        return self.game.word
+
+    @property
+    def hint(self):
+        return self.game.hint
+
+    @property
+    def guessed(self):
+        return self.game.guessed
+
+    @property
+    def mistakes(self):
+        return self.game.mistakes
+
     # Function to check if a guess is correct and place it
     def place_char(self, char):
-        # Check if the character is in the word
-        if char in self.word:
-            # Go through the letters of the word
-            for idx, letter in enumerate(self.word):
-                if char == letter:
-                    # If the letter matches, replace the dash with the character
-                    self.guessed[idx] = char
+        if self.game.guess(char):
             # Show the new guess
-            self.guess_txt.set_text(''.join(self.guessed))
+            self.guess_txt.set_text(self.game.pattern())
         else:
-            # Wrong guess
-            self.mistakes += 1
+            # Wrong guess, the hangman changes
+            self.invalidate(self.sprite_rect)
 
     # Function the check if the player has won or lost
     def check_win(self):
         word = ''.join(self.word)
-        if self.guessed == self.word:
+        if self.game.over():
+            if self.data.journal:
+                self.data.journal.end_game(self.game.won(), self.game.mistakes)
+            if self.data.stats:
+                self.data.stats.record_game(self.data.player, self.topic, word, self.game.won(),
+                    self.game.mistakes, perf_counter() - self.started, self.game.tried)
+        if self.game.won():
             # The guess matches the word
             # Go to the result screen, and say it was correct
-            self.state_machine.switch_state(GameOverState(word, True))
-        elif self.mistakes == 6:
+            self.state_machine.switch_state(GameOverState, word, True)
+        elif self.game.lost():
             # The player made too many mistakes
             # Go to the result screen, and say it was wrong
-            self.state_machine.switch_state(GameOverState(word, False))
+            self.state_machine.switch_state(GameOverState, word, False)
+
+    def widgets(self):
+        return self.alphabet_btns + [self.guess_txt, self.hint_txt]
 
     def render(self, screen):
         # Draw the buttons and texts
@@ -202,44 +600,49 @@ class GameState(State):
             elem.render(screen)
 
         # Draw the hangman based on the no of mistakes made
-        screen.blit(self.data.hangman_sprite, pg.Rect(100, 100, 120, 180), pg.Rect(self.mistakes * 120, 0, 120, 180))
+        screen.blit(self.data.hangman_sprite.frame(MISTAKE_FRAMES[self.mistakes]), self.sprite_rect)
 
 # State the show the result of the game
 class GameOverState(State):
-    def __init__(self, word, correct):
-        # Save the real word and whether or not the answer was guessed correctly
-        self.word = word
-        self.correct = correct
-
     def load(self):
-        # Create a heading to show Won or Lose based on if the guess was correct or not
-        self.result_txt = Label(pg.Rect(200, 50, 400, 50), 
-            "You won!" if self.correct else "You lose!", 
-            font=self.data.large_font)
-        self.word_txt = Label(pg.Rect(150, 120, 500, 50), f"The word was '{self.word}'")
+        # Create a heading to show Won or Lose, and the real word, both filled in for each round
+        self.result_txt = Label(pg.Rect(200, 50, 400, 50), '', font=self.data.large_font)
+        self.word_txt = Label(pg.Rect(150, 120, 500, 50), '')
 
         # Create buttons to play again or go back
         self.back_btn = Button(pg.Rect(325, 450, 175, 50), "Main menu")
         self.play_btn = Button(pg.Rect(325, 510, 175, 50), "Play again")
+        self.dispatcher = EventDispatcher([self.play_btn, self.back_btn])
+
+    def reset(self, word, correct):
+        # Save the real word and whether or not the answer was guessed correctly
+        self.word = word
+        self.correct = correct
+
+        # Show Won or Lose based on if the guess was correct or not
+        self.result_txt.set_text("You won!" if self.correct else "You lose!")
+        self.word_txt.set_text(f"The word was '{self.word}'")
+        self.dispatcher.reset()
 
     def update(self, event):
-        for elem in [self.play_btn, self.back_btn]:
-            elem.update(event)
-        
+        self.dispatcher.dispatch(event)
+
         if self.play_btn.clicked:
             # Play again was clicked, so go back to the game
-            self.state_machine.switch_state(GameState())
+            self.state_machine.switch_state(GameState)
             self.play_btn.click_handled()
         elif self.back_btn.clicked:
             # Back was clicked, so return to the menu
-            self.state_machine.switch_state(HomeState())
+            self.state_machine.switch_state(HomeState)
             self.back_btn.click_handled()
 
+    def widgets(self):
+        return [self.result_txt, self.word_txt, self.back_btn, self.play_btn]
+
     def render(self, screen):
         for elem in [self.result_txt, self.word_txt, self.back_btn, self.play_btn]:
             elem.render(screen)
 
         # Draw the hangman alive or dead based on if the guess was correct
-        sprite_rect = pg.Rect(960 if self.correct else 840, 0, 120, 180)
-        screen.blit(self.data.hangman_sprite, pg.Rect(350, 220, 120, 180), sprite_rect)
+        screen.blit(self.data.hangman_sprite.frame('won' if self.correct else 'lost'), (350, 220))
     
\ No newline at end of file
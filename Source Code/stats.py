@@ -0,0 +1,153 @@
+import sqlite3
+from time import time
+from getpass import getuser
+from batching import BatchWriter
+
+# Statistics of every game played, kept in a local SQLite database
+#
+# Every game is a row in `games`. The totals per topic, per word and per player are kept
+# up to date in their own tables as games are added, so the views over them stay fast
+# however many games were recorded.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    word TEXT NOT NULL,
+    won INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    letters TEXT NOT NULL,
+    played_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS topic_stats (
+    topic TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS word_stats (
+    topic TEXT NOT NULL,
+    word TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (topic, word)
+);
+CREATE INDEX IF NOT EXISTS word_stats_win_rate ON word_stats (CAST(wins AS REAL) / games);
+
+CREATE TABLE IF NOT EXISTS player_stats (
+    player TEXT PRIMARY KEY,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+
+CREATE VIEW IF NOT EXISTS topic_win_rate AS
+    SELECT topic, games, wins, CAST(wins AS REAL) / games AS win_rate FROM topic_stats;
+
+CREATE VIEW IF NOT EXISTS hardest_words AS
+    SELECT topic, word, games, wins, CAST(wins AS REAL) / games AS win_rate,
+        CAST(mistakes AS REAL) / games AS avg_mistakes, seconds / games AS avg_seconds
+    FROM word_stats ORDER BY CAST(wins AS REAL) / games;
+"""
+
+INSERT_GAME = """INSERT INTO games (player, topic, word, won, mistakes, seconds, letters, played_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+UPDATE_TOPIC = """INSERT INTO topic_stats VALUES (?, 1, ?)
+    ON CONFLICT (topic) DO UPDATE SET games = games + 1, wins = wins + excluded.wins"""
+
+UPDATE_WORD = """INSERT INTO word_stats VALUES (?, ?, 1, ?, ?, ?)
+    ON CONFLICT (topic, word) DO UPDATE SET games = games + 1, wins = wins + excluded.wins,
+        mistakes = mistakes + excluded.mistakes, seconds = seconds + excluded.seconds"""
+
+UPDATE_PLAYER = """INSERT INTO player_stats VALUES (?, 1, ?, ?, ?)
+    ON CONFLICT (player) DO UPDATE SET games = games + 1, wins = wins + excluded.wins,
+        mistakes = mistakes + excluded.mistakes, seconds = seconds + excluded.seconds"""
+
+# Name to record the statistics under when none is given
+DEFAULT_PLAYER = 'player'
+
+# The name of the logged in user, or DEFAULT_PLAYER where there is none (like in many containers)
+def default_player():
+    try:
+        return getuser()
+    except (KeyError, OSError, ImportError):
+        return DEFAULT_PLAYER
+
+# Records games from the frame loop without waiting on the disk
+# Games are queued, and a background thread commits them in batches
+class StatsStore(BatchWriter):
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.db = None
+
+        # Create the tables before the game starts, so a bad path fails straight away
+        db = sqlite3.connect(path)
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+        super().__init__("stats", flush_interval)
+
+    def record_game(self, player, topic, word, won, mistakes, seconds, letters):
+        self.queue.put((player, topic, word, int(won), mistakes, seconds, ''.join(sorted(letters)), time()))
+
+    # The connection belongs to the writer thread
+    def open_writer(self):
+        self.db = sqlite3.connect(self.path)
+
+    def close_writer(self):
+        self.db.close()
+
+    # One transaction for the whole batch, a failed batch (like when the database is locked by
+    # python stats.py for too long) is rolled back and logged by BatchWriter
+    def write_batch(self, batch):
+        with self.db as db:
+            db.executemany(INSERT_GAME, batch)
+            db.executemany(UPDATE_TOPIC, [(topic, won) for _, topic, _, won, *_ in batch])
+            db.executemany(UPDATE_WORD, [(topic, word, won, mistakes, seconds)
+                for _, topic, word, won, mistakes, seconds, *_ in batch])
+            db.executemany(UPDATE_PLAYER, [(player, won, mistakes, seconds)
+                for player, _, _, won, mistakes, seconds, *_ in batch])
+
+def query(path, sql, params=()):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute(sql, params).fetchall()
+    finally:
+        db.close()
+
+# Win rate of every topic, as (topic, games, wins, win rate)
+def topic_win_rates(path):
+    return query(path, "SELECT topic, games, wins, win_rate FROM topic_win_rate ORDER BY topic")
+
+# The words with the lowest win rate that were played at least min_games times,
+# as (topic, word, games, win rate, average mistakes, average seconds)
+def hardest_words(path, limit=10, min_games=1):
+    return query(path, """SELECT topic, word, games, win_rate, avg_mistakes, avg_seconds
+        FROM hardest_words WHERE games >= ? LIMIT ?""", (min_games, limit))
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Show the statistics of the games played")
+    parser.add_argument('database', nargs='?', default='stats.db')
+    parser.add_argument('--limit', type=int, default=10, help="no of hardest words to show")
+    parser.add_argument('--min-games', type=int, default=1, help="games a word needs to count as hard")
+    args = parser.parse_args()
+
+    print("Win rate per topic")
+    for topic, games, wins, win_rate in topic_win_rates(args.database):
+        print(f"  {topic:<16} {games:>8} games  {win_rate:6.1%}")
+
+    print("Hardest words")
+    for topic, word, games, win_rate, mistakes, seconds in hardest_words(args.database, args.limit, args.min_games):
+        print(f"  {word:<20} {topic:<12} {games:>6} games  {win_rate:6.1%} won  "
+            f"{mistakes:4.1f} mistakes  {seconds:5.1f}s")
@@ -0,0 +1,131 @@
+import sys
+import threading
+from queue import Queue, Empty
+from os import scandir
+from os.path import join, splitext
+from corpus import stream_csv
+from difficulty import read_scores
+
+# Reloading of the topic CSVs while the game runs
+#
+# A background thread polls the mtime and size of every CSV in the words folder. A file that
+# changed, or was added, is read again once it looks the same on two polls in a row, so a file
+# that is still being written is not read half way. The new word lists are queued, and the
+# frame loop swaps them into the game data in one go with apply_word_changes.
+
+class WordWatcher:
+    def __init__(self, words_dir, interval=1.0, notify=None):
+        self.words_dir = words_dir
+        self.interval = interval
+        # Called from the watcher thread when changes are queued, so a sleeping frame loop wakes up
+        self.notify = notify
+
+        # Batches of topic -> (entries, difficulty scores) or None for a removed topic
+        self.changes = Queue()
+
+        # Topic -> (mtime, size) of the CSV the game has the words of
+        self.seen = self.scan()
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch_loop, name="words", daemon=True)
+        self.thread.start()
+
+    # The (mtime, size) of every topic CSV, like corpus.find_topics hidden files are skipped
+    def scan(self):
+        files = {}
+        with scandir(self.words_dir) as entries:
+            for entry in entries:
+                topic, ext = splitext(entry.name)
+                if ext == '.csv' and not entry.name.startswith('.') and entry.is_file():
+                    info = entry.stat()
+                    files[topic] = (info.st_mtime_ns, info.st_size)
+        return files
+
+    def watch_loop(self):
+        last_scan = self.seen
+        while not self.stopped.wait(self.interval):
+            try:
+                files = self.scan()
+            except OSError:
+                continue
+
+            batch = {}
+            for topic, info in files.items():
+                if info != self.seen.get(topic) and info == last_scan.get(topic):
+                    # Remember the file even if it can't be read, it's only tried again once it changes
+                    self.seen[topic] = info
+                    path = join(self.words_dir, topic + '.csv')
+                    try:
+                        batch[topic] = (stream_csv(path), read_scores(self.words_dir, topic))
+                    except Exception as error:
+                        print(f"Could not reload {path}: {error}", file=sys.stderr)
+            for topic in list(self.seen):
+                if topic not in files and topic not in last_scan:
+                    del self.seen[topic]
+                    batch[topic] = None
+            last_scan = files
+
+            if batch:
+                self.changes.put(batch)
+                if self.notify:
+                    self.notify()
+
+    # Every change queued since the last call, as one batch
+    def poll(self):
+        changes = {}
+        while True:
+            try:
+                changes.update(self.changes.get_nowait())
+            except Empty:
+                return changes
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+# Swap reloaded topics into the game data, on the main thread between two frames
+# The word lists, topics, difficulty scores and sampler are all updated before the next frame
+# Returns False and changes nothing if no words would be left to play
+def apply_word_changes(data, changes):
+    sizes = {topic: len(entries) for topic, entries in data.word_lists.items()}
+    for topic, change in changes.items():
+        if change is None:
+            sizes.pop(topic, None)
+        else:
+            sizes[topic] = len(change[0])
+    if not any(sizes.values()):
+        print("Not reloading the word lists, no words would be left", file=sys.stderr)
+        return False
+
+    everything_selected = set(data.all_topics) <= set(data.current_topics)
+    for topic, change in changes.items():
+        if change is None:
+            data.word_lists.pop(topic, None)
+            data.difficulty_scores.pop(topic, None)
+            scores = None
+        else:
+            data.word_lists[topic], scores = change
+            if scores is None:
+                data.difficulty_scores.pop(topic, None)
+            else:
+                data.difficulty_scores[topic] = scores
+        data.sampler.replace_topic(topic, scores)
+
+    # New topics are only selected if every topic was selected before
+    data.all_topics[:] = sorted(data.word_lists)
+    if everything_selected:
+        current = data.all_topics.copy()
+    else:
+        current = [topic for topic in data.current_topics if topic in data.word_lists]
+    if not any(data.sampler.size(topic) for topic in current):
+        current = data.all_topics.copy()
+    data.current_topics[:] = current
+    if any(data.sampler.size(topic) for topic in current):
+        data.sampler.select(data.current_topics)
+    else:
+        print("No words of the chosen difficulty are left, drawing words of every difficulty", file=sys.stderr)
+        data.difficulty = None
+        data.sampler.set_band(None, data.current_topics)
+
+    data.words_version += 1
+    return True